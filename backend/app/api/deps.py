@@ -1,13 +1,23 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from app.core.config import settings
 from app.schemas.token import TokenData
 from app.models.user import User
 from app.database.connection import db
+from app.core.cache import TTLCache
 from bson import ObjectId
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
+
+# Validated users keyed by username, saves a users lookup on every request
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+def invalidate_user(username: str):
+    # Call whenever a user document changes (registered, disabled, role change)
+    user_cache.invalidate(username)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -25,10 +35,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
+    cached_user = user_cache.get(token_data.username)
+    if cached_user is not None:
+        return cached_user
+    
     user = await db.users.find_one({"username": token_data.username})
     if user is None:
         raise credentials_exception
-    return User(**user)
+    current_user = User(**user)
+    user_cache.set(token_data.username, current_user)
+    return current_user
+
+async def get_stream_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(None)
+):
+    # Browsers' EventSource cannot set headers, so streams also accept ?access_token=
+    current_user = await get_current_user(token or access_token or "")
+    if current_user.disabled:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if current_user.disabled:
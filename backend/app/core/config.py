@@ -1,3 +1,5 @@
+from typing import Literal
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -6,6 +8,105 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 # 1 day
 
+    # Server (python -m app.server). Each worker process has its own Motor client,
+    # so the cluster sees up to WEB_CONCURRENCY * MONGO_MAX_POOL_SIZE connections
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WEB_CONCURRENCY: int = 0 # Worker processes, 0 = one per CPU core
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30 # In-flight requests get this long on reload/stop
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1" # Proxies trusted for X-Forwarded-* headers
+    STARTUP_LOCK_SECONDS: int = 300 # Lease on the startup tasks lock held by one worker
+    # Import pandas/openpyxl at start-up instead of on the first upload or xlsx export.
+    # Off by default so autoscaled workers come up fast; turn on for long-lived ones
+    PRELOAD_HEAVY_IMPORTS: bool = False
+
+    # MongoDB client pool
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 5 # Connections kept open and warmed at startup
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 5000 # Max wait for a free pooled connection
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: int = 30000
+    MONGO_COMPRESSORS: str = "" # e.g. "zstd,snappy,zlib"
+    # Read preference for reporting reads (analytics, export, listings); marking always uses the primary
+    REPORTING_READ_PREFERENCE: Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"] = "primary"
+
+    # Route and Mongo command metrics served at /metrics
+    METRICS_ENABLED: bool = True
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12 # Cost factor for new hashes, older hashes are upgraded on login
+    PASSWORD_HASH_CONCURRENCY: int = 4 # Threads available for bcrypt work
+
+    # Attendance layout: "records" (one document per student per day) or
+    # "class_days" (one document per class per day, see app/database/attendance_store.py)
+    ATTENDANCE_STORAGE: Literal["records", "class_days"] = "records"
+
+    ATTENDANCE_MARK_BATCH_SIZE: int = 1000 # Upserts per unordered bulk_write in mark_attendance
+
+    # Marks must name a student in the roster; branch/year come from the roster.
+    # Off: unknown roll numbers are stored with the branch/year sent by the client
+    ATTENDANCE_REQUIRE_ENROLLED: bool = True
+    ROSTER_CHECK_SECONDS: float = 2.0 # How often each process checks the in-memory roster is current
+
+    # Attendance dates are stored as day buckets in this timezone
+    ATTENDANCE_TIMEZONE: str = "UTC"
+
+    # Authenticated user cache (per process)
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    # Read response cache (per process), keyed on the data versions in cache_versions
+    # Only used with REPORTING_READ_PREFERENCE=primary (no caching or ETags otherwise)
+    RESPONSE_CACHE_SIZE: int = 256 # 0 disables the cache; ETags are still sent
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = 2_000_000 # Larger bodies are sent but not kept
+
+    # Bulk ingest
+    STUDENT_UPLOAD_BATCH_SIZE: int = 1000 # Upserts per bulk_write round trip
+    PARSE_WORKERS: int = 2 # Processes for spreadsheet parsing, 0 parses in a thread instead
+
+    # Indexes
+    CREATE_INDEXES_ON_STARTUP: bool = True
+
+    # Listings
+    LIST_PAGE_SIZE_DEFAULT: int = 1000 # Page size when a JSON listing request has no `limit`
+    LIST_PAGE_SIZE_MAX: int = 5000 # Largest accepted `limit` on listing endpoints
+
+    # Opt-in fast path for large lists: projected fields, no response_model
+    # re-validation, orjson encoding (see app/core/serialization.py)
+    FAST_LIST_RESPONSES: bool = False
+
+    # Background jobs (app/core/jobs.py)
+    JOB_WORKERS: int = 2 # Concurrent jobs per process, 0 disables job processing in this process
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    JOB_LEASE_SECONDS: int = 300 # A running job whose lease lapses is picked up again
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETENTION_SECONDS: int = 7 * 24 * 3600 # Finished jobs and their result files are deleted after this
+
+    # Closed-term archive (app/database/archive.py)
+    ARCHIVE_STATE_TTL_SECONDS: int = 30 # How long each process caches the archive boundary
+    # Wait between publishing a boundary and deleting hot copies; must exceed the TTL above
+    # so no process still accepts marks for closed days when they are deleted
+    ARCHIVE_GRACE_SECONDS: int = 90
+
+    # Live attendance feed (GET /api/attendance/live). "local" only reaches clients of the
+    # worker that took the mark; use "change_stream" (replica set required) with several workers
+    LIVE_FEED_SOURCE: Literal["local", "change_stream"] = "local"
+    LIVE_FEED_QUEUE_SIZE: int = 100 # Events buffered per client before it is told to resync
+    LIVE_FEED_KEEPALIVE_SECONDS: float = 15.0
+    LIVE_FEED_MAX_CLIENTS: int = 1000 # Per worker
+
+    # Exports
+    EXPORT_BATCH_SIZE: int = 1000 # Documents pulled off the cursor per round trip
+
     model_config = SettingsConfigDict(env_file=".env")
 
+    @model_validator(mode="after")
+    def check_archive_timing(self):
+        # The archive job's lease is renewed while it sleeps, only the boundary cache matters
+        if self.ARCHIVE_GRACE_SECONDS <= self.ARCHIVE_STATE_TTL_SECONDS:
+            raise ValueError("ARCHIVE_GRACE_SECONDS must be greater than ARCHIVE_STATE_TTL_SECONDS")
+        return self
+
 settings = Settings()
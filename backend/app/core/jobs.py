@@ -0,0 +1,239 @@
+import time
+import asyncio
+import traceback
+from datetime import datetime, timedelta
+from bson import ObjectId
+from gridfs.errors import NoFile
+from pymongo import ReturnDocument
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from app.core.config import settings
+from app.database import connection
+from app.database.connection import db
+
+# Background jobs persisted in the `jobs` collection. Any process running
+# workers claims queued jobs atomically, so jobs survive restarts and are not
+# run twice when several workers poll. Input uploads and result files live in
+# the `job_files` GridFS bucket; inputs are dropped when the job finishes, finished
+# jobs and their result files after JOB_RETENTION_SECONDS.
+#
+# Handlers are registered with @job_handler("kind") and receive a JobContext.
+
+JOB_HANDLERS = {}
+FINISHED = ["succeeded", "failed"]
+PURGE_INTERVAL_SECONDS = 3600
+
+_workers = []
+_wake = None
+_purged_at = None
+
+
+def job_handler(kind: str):
+    def register(function):
+        JOB_HANDLERS[kind] = function
+        return function
+    return register
+
+
+def _files():
+    return AsyncIOMotorGridFSBucket(connection.get_database(), bucket_name="job_files")
+
+
+class JobContext:
+    def __init__(self, job: dict):
+        self.job = job
+        self.id = job["_id"]
+        self.params = job.get("params", {})
+
+    async def read_input(self) -> bytes:
+        stream = await _files().open_download_stream(self.job["input_file_id"])
+        return await stream.read()
+
+    async def progress(self, done: int, total: int = None):
+        # Also renews the lease so a live job is never reclaimed by another worker
+        now = datetime.utcnow()
+        await db.jobs.update_one(
+            {"_id": self.id},
+            {"$set": {
+                "progress": {"done": done, "total": total},
+                "updated_at": now,
+                "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            }}
+        )
+
+    async def save_result_file(self, chunks, filename: str, media_type: str):
+        # chunks: async iterator of str/bytes, written to GridFS as they are produced
+        upload = _files().open_upload_stream(filename, metadata={"job_id": self.id, "media_type": media_type})
+        async for chunk in chunks:
+            await upload.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        await upload.close()
+        await db.jobs.update_one(
+            {"_id": self.id},
+            {"$set": {"result_file_id": upload._id, "result_filename": filename, "result_media_type": media_type}}
+        )
+
+
+async def submit_job(kind: str, params: dict, created_by: str, input_bytes: bytes = None, input_name: str = None) -> str:
+    now = datetime.utcnow()
+    job = {
+        "kind": kind,
+        "status": "queued",
+        "params": params,
+        "progress": {"done": 0, "total": None},
+        "attempts": 0,
+        "created_by": created_by,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if input_bytes is not None:
+        job["input_file_id"] = await _files().upload_from_stream(input_name or kind, input_bytes)
+    result = await db.jobs.insert_one(job)
+    if _wake is not None:
+        _wake.set()
+    return str(result.inserted_id)
+
+
+async def get_job(job_id: str):
+    if not ObjectId.is_valid(job_id):
+        return None
+    return await db.jobs.find_one({"_id": ObjectId(job_id)})
+
+
+async def open_result(job: dict):
+    return await _files().open_download_stream(job["result_file_id"])
+
+
+async def _claim():
+    # Queued jobs, or running ones whose worker stopped renewing the lease (e.g. a restart)
+    now = datetime.utcnow()
+    return await db.jobs.find_one_and_update(
+        {
+            "$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires_at": {"$lt": now}},
+            ],
+            "attempts": {"$lt": settings.JOB_MAX_ATTEMPTS},
+        },
+        {
+            "$set": {
+                "status": "running",
+                "started_at": now,
+                "updated_at": now,
+                "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _delete_files(job: dict, fields):
+    for field in fields:
+        if job.get(field) is not None:
+            try:
+                await _files().delete(job[field])
+            except NoFile:
+                pass
+
+
+async def _purge_finished():
+    # At most hourly per process: drop expired finished jobs with their files
+    global _purged_at
+    if _purged_at is not None and time.monotonic() - _purged_at < PURGE_INTERVAL_SECONDS:
+        return
+    _purged_at = time.monotonic()
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.JOB_RETENTION_SECONDS)
+    expired = db.jobs.find(
+        {"status": {"$in": FINISHED}, "finished_at": {"$lt": cutoff}},
+        {"input_file_id": 1, "result_file_id": 1}
+    )
+    async for job in expired:
+        await _delete_files(job, ["input_file_id", "result_file_id"])
+        await db.jobs.delete_one({"_id": job["_id"]})
+
+
+async def _fail_exhausted():
+    # Running jobs whose lease lapsed on their last allowed attempt are never claimed
+    # again; mark them failed so their status does not read "running" forever
+    now = datetime.utcnow()
+    await db.jobs.update_many(
+        {
+            "status": "running",
+            "lease_expires_at": {"$lt": now},
+            "attempts": {"$gte": settings.JOB_MAX_ATTEMPTS},
+        },
+        {"$set": {
+            "status": "failed",
+            "error": f"Worker stopped during the last of {settings.JOB_MAX_ATTEMPTS} attempts",
+            "finished_at": now,
+            "updated_at": now,
+        }}
+    )
+
+
+async def _keep_leased(job_id):
+    # Heartbeat for the whole run, so handlers that never report progress (imports,
+    # the archive grace period) are not reclaimed by another worker while alive
+    while True:
+        await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+        try:
+            await db.jobs.update_one(
+                {"_id": job_id, "status": "running"},
+                {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)}}
+            )
+        except Exception:
+            traceback.print_exc()
+
+
+async def _run(job: dict):
+    handler = JOB_HANDLERS.get(job["kind"])
+    update = {"finished_at": datetime.utcnow()}
+    heartbeat = asyncio.create_task(_keep_leased(job["_id"]))
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind {job['kind']!r}")
+        result = await handler(JobContext(job))
+        update.update({"status": "succeeded", "result": result or {}})
+    except Exception as e:
+        traceback.print_exc()
+        update.update({"status": "failed", "error": str(e)})
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+    update["updated_at"] = update["finished_at"] = datetime.utcnow()
+    await db.jobs.update_one({"_id": job["_id"]}, {"$set": update, "$unset": {"input_file_id": ""}})
+    # The upload is only needed while the job can still run
+    await _delete_files(job, ["input_file_id"])
+
+
+async def _worker():
+    while True:
+        try:
+            await _fail_exhausted()
+            await _purge_finished()
+            job = await _claim()
+        except Exception:
+            traceback.print_exc()
+            job = None
+        if job is not None:
+            await _run(job)
+            continue
+        _wake.clear()
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=settings.JOB_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_workers():
+    global _wake
+    _wake = asyncio.Event()
+    for _ in range(settings.JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
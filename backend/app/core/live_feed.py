@@ -0,0 +1,138 @@
+import json
+import asyncio
+import traceback
+from datetime import datetime
+from app.core.config import settings
+from app.database.connection import db
+from app.database.summaries import COUNT_FIELDS
+
+# Live attendance count deltas for dashboards (GET /api/attendance/live).
+# mark_attendance publishes one event per (date, branch, year) whose counts moved;
+# each worker has a single Broadcaster fanning events out to its SSE clients.
+#   LIVE_FEED_SOURCE=local          events go straight to this worker's broadcaster
+#                                   (enough for a single worker)
+#   LIVE_FEED_SOURCE=change_stream  events are inserted into attendance_events and every
+#                                   worker relays them from a change stream (needs a replica set)
+EVENTS_COLLECTION = "attendance_events"
+RESYNC = {"type": "resync"} # Sent to a client that fell behind instead of the events it missed
+
+
+class Subscription:
+
+    def __init__(self, branch=None, year=None):
+        self.branch = branch
+        self.year = year
+        self.queue = asyncio.Queue(maxsize=settings.LIVE_FEED_QUEUE_SIZE)
+
+    def wants(self, event: dict) -> bool:
+        return (not self.branch or event["branch"] == self.branch) and (not self.year or event["year"] == self.year)
+
+    def offer(self, event: dict):
+        # Never blocks the publisher: a client whose queue is full loses its backlog
+        # and is told to reload current totals, then continues with new events
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    def close(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Broadcaster:
+
+    def __init__(self):
+        self.subscriptions = set()
+        self._relay = None
+
+    def subscribe(self, branch=None, year=None):
+        if len(self.subscriptions) >= settings.LIVE_FEED_MAX_CLIENTS:
+            return None
+        subscription = Subscription(branch, year)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def broadcast(self, events: list):
+        for subscription in list(self.subscriptions):
+            for event in events:
+                if subscription.wants(event):
+                    subscription.offer(event)
+
+    async def _relay_change_stream(self):
+        # Resumes after errors (failover, network) from the last event seen
+        resume_token = None
+        while True:
+            try:
+                async with db[EVENTS_COLLECTION].watch(
+                    [{"$match": {"operationType": "insert"}}],
+                    resume_after=resume_token
+                ) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self.broadcast(change["fullDocument"]["events"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(1)
+
+    def start(self):
+        if settings.LIVE_FEED_SOURCE == "change_stream" and self._relay is None:
+            self._relay = asyncio.create_task(self._relay_change_stream())
+
+    async def stop(self):
+        if self._relay is not None:
+            self._relay.cancel()
+            await asyncio.gather(self._relay, return_exceptions=True)
+            self._relay = None
+        # Wake every open stream so it can finish
+        for subscription in list(self.subscriptions):
+            subscription.close()
+
+
+broadcaster = Broadcaster()
+
+
+async def publish_deltas(date: datetime, deltas: dict):
+    # deltas as returned by refresh_class_summaries: {(branch, year): {"present": n, ...}}
+    events = [
+        {"type": "delta", "date": date.isoformat(), "branch": branch, "year": year,
+         **{field: counters.get(field, 0) for field in COUNT_FIELDS}}
+        for (branch, year), counters in deltas.items()
+    ]
+    if not events:
+        return
+    if settings.LIVE_FEED_SOURCE == "change_stream":
+        await db[EVENTS_COLLECTION].insert_one({"events": events, "created_at": datetime.utcnow()})
+    else:
+        broadcaster.broadcast(events)
+
+
+def _sse(event: dict) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+async def event_stream(request, subscription: Subscription):
+    try:
+        yield _sse({"type": "ready"})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.LIVE_FEED_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                # Comment line keeps proxies from closing an idle stream
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                return
+            yield _sse(event)
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,185 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+from pymongo import monitoring
+
+# Small in-process metrics registry rendered in the Prometheus text format.
+# Route timings come from MetricsMiddleware, Mongo timings from MongoCommandListener.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, label_values: tuple, value: float):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for label_values, counts, total, count in snapshot:
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            yield f'{self.name}_bucket{{{labels},le="+Inf"}} {count}'
+            yield f"{self.name}_sum{{{labels}}} {total}"
+            yield f"{self.name}_count{{{labels}}} {count}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, label_values: tuple, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            snapshot = list(self._values.items())
+        for label_values, value in snapshot:
+            yield f"{self.name}{{{_labels(self.labels, label_values)}}} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, label_values: tuple, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method",)
+)
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command", "outcome")
+)
+mongo_command_documents = Counter(
+    "mongo_command_documents_total", "Documents returned or written by MongoDB commands", ("collection", "command")
+)
+
+REGISTRY = [http_request_duration, http_requests_in_flight, mongo_command_duration, mongo_command_documents]
+
+
+def render_metrics(extra_gauges: dict = None, extra_counters: dict = None) -> str:
+    # extra_gauges: {"metric_name": value} for point-in-time values owned elsewhere,
+    # extra_counters: the same for monotonic "_total" counts kept elsewhere
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for kind, values in (("gauge", extra_gauges), ("counter", extra_counters)):
+        for name, value in (values or {}).items():
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    # Pure ASGI middleware so streaming responses are timed until their last chunk
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.inc((method,), -1)
+            http_request_duration.observe((method, _route_template(scope), status[0]), time.perf_counter() - start)
+
+
+def _route_template(scope) -> str:
+    # Label with the route template (path params put back as {name}) to keep cardinality bounded
+    if scope.get("route") is None and scope.get("endpoint") is None:
+        return "unmatched"
+    params = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    segments = [f"{{{params[segment]}}}" if segment in params else segment for segment in scope["path"].split("/")]
+    return "/".join(segments)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    # Runs on pymongo's threads, so it only records into the lock-protected metrics
+    def __init__(self):
+        self._pending = {}
+        self._lock = Lock()
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else "-"
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = collection
+
+    def _collection(self, event):
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), "-")
+
+    def succeeded(self, event):
+        collection = self._collection(event)
+        mongo_command_duration.observe((collection, event.command_name, "ok"), event.duration_micros / 1e6)
+        documents = _document_count(event.reply)
+        if documents:
+            mongo_command_documents.inc((collection, event.command_name), documents)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        mongo_command_duration.observe((collection, event.command_name, "error"), event.duration_micros / 1e6)
+
+
+def _document_count(reply) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
@@ -0,0 +1,86 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.database.connection import db
+from app.database.versions import current_versions
+
+# Rendered bodies of GET list/analytics responses. Keys carry the data versions
+# the response depends on, so a write never needs to find and evict entries:
+# the next read simply computes a new key and the old one ages out of the LRU.
+response_cache = TTLCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+CACHED_HEADERS = ("content-type", "x-next-cursor")
+CACHE_CONTROL = "private, no-cache" # Clients may keep a copy but must revalidate with If-None-Match
+
+
+def _etag(body: bytes) -> str:
+    # Strong validator: derived from the exact bytes sent
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+async def cached_response(request: Request, scopes: list, vary=None) -> Optional[Response]:
+    # Called by an endpoint after its auth dependencies ran. scopes lists the
+    # (collection, branch, year, date) versions the response depends on; vary is
+    # anything else the body depends on that is not in the query string (e.g. today).
+    # Returns the cached response (or a 304), else marks the request so
+    # CachedRoute stores what the endpoint renders.
+    if settings.REPORTING_READ_PREFERENCE != "primary":
+        # Versions come from the primary but bodies from read_db: a lagging secondary's
+        # body would be cached under the new version, so nothing is cached
+        return None
+    versions = await current_versions(db, scopes)
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), versions, vary)
+    entry = response_cache.get(key)
+    if entry is None:
+        request.state.response_cache_key = key
+        return None
+
+    body, etag, headers = entry
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return _not_modified(etag)
+    return Response(body, headers={**headers, "ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+class CachedRoute(APIRoute):
+    # Route class for routers whose endpoints call cached_response(): keeps the
+    # rendered body of a cacheable 200, tags it with an ETag and answers
+    # If-None-Match with 304. Other routes pass through untouched.
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def cached_handler(request: Request) -> Response:
+            response = await handler(request)
+            key = getattr(request.state, "response_cache_key", None)
+            # Streaming responses (exports, NDJSON) have no body to keep
+            if key is None or response.status_code != 200 or not hasattr(response, "body"):
+                return response
+
+            etag = _etag(response.body)
+            if len(response.body) <= settings.RESPONSE_CACHE_MAX_ENTRY_BYTES:
+                headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                response_cache.set(key, (response.body, etag, headers))
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                return _not_modified(etag)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = CACHE_CONTROL
+            return response
+
+        return cached_handler
@@ -1,23 +1,38 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-# Monkeypatch passlib to support bcrypt >= 4.0.0
-import passlib.context
 import bcrypt
-
-passlib.context.CryptContext.verify = lambda self, secret, hash: bcrypt.checkpw(secret.encode(), hash.encode())
-passlib.context.CryptContext.hash = lambda self, secret: bcrypt.hashpw(secret.encode(), bcrypt.gensalt()).decode()
-
-from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+# and caps how many hashes run at once during a login rush
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_CONCURRENCY,
+    thread_name_prefix="password-hash"
+)
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode()
+
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, get_password_hash, password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like $2b$<cost>$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -0,0 +1,43 @@
+import json
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError: # Optional, falls back to the stdlib encoder
+    orjson = None
+
+# Fields the Attendance / Student response models actually use, as Mongo projections
+ATTENDANCE_PROJECTION = {"_id": 1, "date": 1, "branch": 1, "year": 1, "student_roll_number": 1, "status": 1, "marked_by": 1}
+STUDENT_PROJECTION = {"_id": 1, "s_no": 1, "roll_number": 1, "name": 1, "branch": 1, "year": 1, "contact": 1}
+
+
+def _default(value):
+    # ObjectId and anything else Mongo hands back that JSON has no type for
+    return str(value)
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=lambda value: value.isoformat() if hasattr(value, "isoformat") else str(value)).encode()
+
+
+class MongoJSONResponse(JSONResponse):
+    # Renders Mongo documents directly: datetimes as ISO strings, ObjectIds as str
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def trusted_response(documents: list, defaults: dict = None, headers: dict = None) -> MongoJSONResponse:
+    # Fast path for documents we wrote ourselves: skip response_model re-validation
+    # and encode straight from the projected Mongo documents
+    if defaults:
+        for document in documents:
+            for field, value in defaults.items():
+                document.setdefault(field, value)
+    return MongoJSONResponse(documents, headers=headers)
+
+
+def fast_lists_enabled() -> bool:
+    return settings.FAST_LIST_RESPONSES
@@ -0,0 +1,181 @@
+import sys
+import time
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReplaceOne
+from app.core.config import settings
+from app.database.attendance_store import ClassDayStore, STATUS_CODES, get_attendance_store, paged_pipeline
+from app.database.versions import bump_versions
+from app.utils.dates import day_bucket
+
+# Hot/cold tiering for attendance. Marks before the archive boundary (closed terms)
+# live in `attendance_archive`, one class-day document per (date, branch, year)
+# like the class_days layout; the hot store only holds the current term.
+#   archive_state: {"_id": "attendance", "archived_before": <day>, "updated_at"}
+# Reads go through read_store(), which picks the hot store, the archive or both
+# from the requested date range. Closed days can no longer be marked.
+STATE_ID = "attendance"
+
+
+class ArchiveStore(ClassDayStore):
+    collection = "attendance_archive"
+
+
+ARCHIVE = ArchiveStore()
+
+_boundary = {"archived_before": None, "checked_at": None}
+
+
+async def archived_before(database):
+    # Boundary cached per process for ARCHIVE_STATE_TTL_SECONDS. archive_terms()
+    # waits longer than that before deleting hot copies, so a stale boundary only
+    # means reading the hot copy a little longer
+    checked_at = _boundary["checked_at"]
+    if checked_at is None or time.monotonic() - checked_at >= settings.ARCHIVE_STATE_TTL_SECONDS:
+        state = await database.archive_state.find_one({"_id": STATE_ID})
+        _boundary["archived_before"] = state["archived_before"] if state else None
+        _boundary["checked_at"] = time.monotonic()
+    return _boundary["archived_before"]
+
+
+def _bounds(condition):
+    # (lowest, highest) day a date condition can match, None when open-ended
+    if condition is None:
+        return None, None
+    if isinstance(condition, datetime):
+        return condition, condition
+    return condition.get("$gte"), condition.get("$lte")
+
+
+def _restrict(match: dict, operator: str, boundary: datetime) -> dict:
+    match = dict(match)
+    condition = match.get("date")
+    condition = dict(condition) if isinstance(condition, dict) else {}
+    condition[operator] = boundary
+    match["date"] = condition
+    return match
+
+
+class TieredStore:
+    # Read-only view over both tiers for ranges that cross the boundary. Each side
+    # is cut at the boundary, so a hot copy still waiting to be deleted is not
+    # counted twice. Archive ids are strings and hot ids (records layout) ObjectIds,
+    # and Mongo sorts strings first, so keyset pages walk the archive then the hot store.
+    def __init__(self, hot, boundary: datetime):
+        self.hot = hot
+        self.boundary = boundary
+        self.collection = hot.collection
+
+    def record_pipeline(self, match: dict) -> list:
+        archive_pipeline = ARCHIVE.record_pipeline(_restrict(match, "$lt", self.boundary))
+        return self.hot.record_pipeline(_restrict(match, "$gte", self.boundary)) + [
+            {"$unionWith": {"coll": ARCHIVE.collection, "pipeline": archive_pipeline}},
+        ]
+
+    def find_records(self, database, query: dict, limit=None, after=None, projection=None):
+        after_match = None
+        if after and ObjectId.is_valid(after):
+            after_match = {"_id": {"$gt": ObjectId(after)}}
+        elif after:
+            after_match = {"$or": [{"_id": {"$gt": after}}, {"_id": {"$type": "objectId"}}]}
+        pipeline = paged_pipeline(self.record_pipeline(query), after_match, limit, projection)
+        return database[self.collection].aggregate(pipeline, allowDiskUse=True)
+
+
+async def read_store(database, date=None):
+    # date: a date_condition() value (exact day, {"$gte", "$lte"} range or None)
+    hot = get_attendance_store()
+    boundary = await archived_before(database)
+    if boundary is None:
+        return hot
+    lowest, highest = _bounds(date)
+    if highest is not None and highest < boundary:
+        return ARCHIVE
+    if lowest is not None and lowest >= boundary:
+        return hot
+    return TieredStore(hot, boundary)
+
+
+async def _copy_to_archive(database, before: datetime) -> int:
+    # Rebuild every closed class-day from the hot store and replace its archive document
+    hot = get_attendance_store()
+    pipeline = hot.record_pipeline({"date": {"$lt": before}}) + [
+        {"$group": {
+            "_id": {"date": "$date", "branch": "$branch", "year": "$year"},
+            "statuses": {"$push": {"k": "$student_roll_number", "v": "$status"}},
+            "marked_by": {"$last": "$marked_by"},
+            "created_at": {"$min": "$created_at"},
+            "updated_at": {"$max": "$updated_at"},
+        }},
+    ]
+    copied = 0
+    ops = []
+    async for bucket in database[hot.collection].aggregate(pipeline, allowDiskUse=True):
+        key = bucket["_id"]
+        document = {
+            **key,
+            "statuses": {item["k"]: STATUS_CODES.get(item["v"], item["v"]) for item in bucket["statuses"]},
+            "marked_by": bucket["marked_by"],
+            "created_at": bucket["created_at"],
+            "updated_at": bucket["updated_at"],
+        }
+        ops.append(ReplaceOne(key, document, upsert=True))
+        if len(ops) >= settings.ATTENDANCE_MARK_BATCH_SIZE:
+            await database[ARCHIVE.collection].bulk_write(ops, ordered=False)
+            copied += len(ops)
+            ops = []
+    if ops:
+        await database[ARCHIVE.collection].bulk_write(ops, ordered=False)
+        copied += len(ops)
+    return copied
+
+
+async def archive_terms(database, before: datetime, progress=None) -> dict:
+    # Close every day before `before`: copy it to the archive, publish the new
+    # boundary, give other processes ARCHIVE_GRACE_SECONDS to pick it up, then copy
+    # again (catching marks that raced the boundary) and delete the hot copies
+    before = day_bucket(before)
+    current = await database.archive_state.find_one({"_id": STATE_ID})
+    if current and before <= current["archived_before"]:
+        raise ValueError(f"Attendance is already archived before {current['archived_before'].date()}")
+
+    hot = get_attendance_store()
+    copied = await _copy_to_archive(database, before)
+    if progress:
+        await progress(copied)
+    await database.archive_state.update_one(
+        {"_id": STATE_ID},
+        {"$set": {"archived_before": before, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    _boundary["checked_at"] = None
+    await bump_versions(database, "attendance")
+
+    await asyncio.sleep(settings.ARCHIVE_GRACE_SECONDS)
+    copied = await _copy_to_archive(database, before)
+    result = await database[hot.collection].delete_many({"date": {"$lt": before}})
+    await bump_versions(database, "attendance")
+    if progress:
+        await progress(copied)
+    return {"archived_before": before.isoformat(), "class_days": copied, "deleted": result.deleted_count}
+
+
+async def main(argv) -> int:
+    from app.database.connection import db
+
+    if len(argv) != 2 or argv[0] != "close-term":
+        print("usage: python -m app.database.archive close-term YYYY-MM-DD")
+        return 2
+    try:
+        result = await archive_terms(db, datetime.fromisoformat(argv[1]))
+    except ValueError as e:
+        print(f"[archive] {e}")
+        return 1
+    print(f"[archive] {result['class_days']} class-days archived, {result['deleted']} hot documents removed")
+    return 0
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m app.database.archive close-term 2024-06-01
+    sys.exit(asyncio.run(main(sys.argv[1:])))
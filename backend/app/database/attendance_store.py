@@ -0,0 +1,257 @@
+import sys
+import asyncio
+from collections import defaultdict
+from pymongo import UpdateOne
+from app.core.config import settings
+from app.utils.pagination import keyset_cursor
+from app.database.bulk import chunked
+from app.database.versions import bump_versions
+
+# Repository for attendance marks. Routers and reports only see flat records
+#   {_id, date, branch, year, student_roll_number, status, marked_by, created_at, updated_at}
+# whatever layout ATTENDANCE_STORAGE selects:
+#   "records":    one `attendance` document per student per day
+#   "class_days": one `attendance_class_days` document per (date, branch, year)
+#                 holding a roll number -> status code map
+
+STATUS_CODES = {"Present": "P", "Absent": "A"}
+CLASS_FIELDS = ("date", "branch", "year")
+
+
+def paged_pipeline(pipeline: list, after_match=None, limit=None, projection=None) -> list:
+    # Keyset pagination stages for record pipelines whose ids are not plain ObjectIds
+    if after_match:
+        pipeline.append({"$match": after_match})
+    if limit or after_match:
+        pipeline.append({"$sort": {"_id": 1}})
+    if limit:
+        pipeline.append({"$limit": limit})
+    if projection:
+        pipeline.append({"$project": projection})
+    return pipeline
+
+
+class RecordStore:
+    collection = "attendance"
+
+    def record_pipeline(self, match: dict) -> list:
+        # Aggregation stages yielding flat records that satisfy `match`
+        return [{"$match": match}]
+
+    def find_records(self, database, query: dict, limit=None, after=None, projection=None):
+        return keyset_cursor(database[self.collection], query, limit, after, projection)
+
+    async def existing_statuses(self, database, date, roll_numbers) -> dict:
+        existing = {}
+        cursor = database[self.collection].find(
+            {"date": date, "student_roll_number": {"$in": list(roll_numbers)}},
+            {"_id": 0, "student_roll_number": 1, "branch": 1, "year": 1, "status": 1}
+        )
+        async for doc in cursor:
+            existing[doc["student_roll_number"]] = doc
+        return existing
+
+    async def write_marks(self, database, date, records, existing, marked_by, timestamp) -> dict:
+        # records: [(roll_number, branch, year, status)], already reduced to the ones that changed
+        ops = [
+            UpdateOne(
+                {"student_roll_number": roll_number, "date": date},
+                {
+                    "$set": {
+                        "branch": branch,
+                        "year": year,
+                        "status": status,
+                        "marked_by": marked_by,
+                        "updated_at": timestamp
+                    },
+                    "$setOnInsert": {"created_at": timestamp}
+                },
+                upsert=True
+            )
+            for roll_number, branch, year, status in records
+        ]
+        counts = {"matched": 0, "modified": 0, "upserted": 0}
+        for batch in chunked(ops, settings.ATTENDANCE_MARK_BATCH_SIZE):
+            result = await database[self.collection].bulk_write(batch, ordered=False)
+            counts["matched"] += result.matched_count
+            counts["modified"] += result.modified_count
+            counts["upserted"] += result.upserted_count
+        return counts
+
+
+class ClassDayStore:
+    collection = "attendance_class_days"
+
+    def record_pipeline(self, match: dict) -> list:
+        class_match = {key: value for key, value in match.items() if key in CLASS_FIELDS}
+        record_match = {key: value for key, value in match.items() if key not in CLASS_FIELDS}
+        decode_status = {"$switch": {
+            "branches": [{"case": {"$eq": ["$statuses.v", code]}, "then": status} for status, code in STATUS_CODES.items()],
+            "default": "$statuses.v",
+        }}
+        pipeline = [
+            {"$match": class_match},
+            {"$project": {
+                "date": 1, "branch": 1, "year": 1, "marked_by": 1, "created_at": 1, "updated_at": 1,
+                "statuses": {"$objectToArray": "$statuses"},
+            }},
+            {"$unwind": "$statuses"},
+            {"$project": {
+                "_id": {"$concat": [{"$toString": "$_id"}, ":", "$statuses.k"]},
+                "date": 1,
+                "branch": 1,
+                "year": 1,
+                "student_roll_number": "$statuses.k",
+                "status": decode_status,
+                "marked_by": 1,
+                "created_at": 1,
+                "updated_at": 1,
+            }},
+        ]
+        if record_match:
+            pipeline.append({"$match": record_match})
+        return pipeline
+
+    def find_records(self, database, query: dict, limit=None, after=None, projection=None):
+        # Record ids are "<class day id>:<roll number>", which sort the same way as strings
+        after_match = {"_id": {"$gt": after}} if after else None
+        pipeline = paged_pipeline(self.record_pipeline(query), after_match, limit, projection)
+        return database[self.collection].aggregate(pipeline, allowDiskUse=True)
+
+    async def existing_statuses(self, database, date, roll_numbers) -> dict:
+        roll_numbers = list(roll_numbers)
+        projection = {"_id": 0, "branch": 1, "year": 1, **{f"statuses.{roll}": 1 for roll in roll_numbers}}
+        existing = {}
+        async for doc in database[self.collection].find({"date": date}, projection):
+            for roll_number, code in doc.get("statuses", {}).items():
+                existing[roll_number] = {
+                    "student_roll_number": roll_number,
+                    "branch": doc["branch"],
+                    "year": doc["year"],
+                    "status": _decode(code),
+                }
+        return existing
+
+    async def write_marks(self, database, date, records, existing, marked_by, timestamp) -> dict:
+        for roll_number, *_ in records:
+            if "." in roll_number or roll_number.startswith("$"):
+                raise ValueError(f"Roll number {roll_number!r} cannot be stored in class_days mode")
+
+        # One upsert per class, plus removals for students whose class changed
+        sets = defaultdict(dict)
+        unsets = defaultdict(dict)
+        for roll_number, branch, year, status in records:
+            sets[(branch, year)][f"statuses.{roll_number}"] = STATUS_CODES.get(status, status)
+            before = existing.get(roll_number)
+            if before and (before["branch"], before["year"]) != (branch, year):
+                unsets[(before["branch"], before["year"])][f"statuses.{roll_number}"] = ""
+        for key, fields in sets.items():
+            for field in fields:
+                unsets.get(key, {}).pop(field, None)
+
+        ops = [
+            UpdateOne(
+                {"date": date, "branch": branch, "year": year},
+                {"$unset": fields},
+            )
+            for (branch, year), fields in unsets.items() if fields
+        ]
+        ops += [
+            UpdateOne(
+                {"date": date, "branch": branch, "year": year},
+                {
+                    "$set": {**fields, "marked_by": marked_by, "updated_at": timestamp},
+                    "$setOnInsert": {"created_at": timestamp}
+                },
+                upsert=True
+            )
+            for (branch, year), fields in sets.items()
+        ]
+        for batch in chunked(ops, settings.ATTENDANCE_MARK_BATCH_SIZE):
+            await database[self.collection].bulk_write(batch, ordered=False)
+
+        # Report per mark rather than per class document, same as the records layout
+        upserted = sum(1 for record in records if record[0] not in existing)
+        return {"matched": len(records) - upserted, "modified": len(records) - upserted, "upserted": upserted}
+
+
+def changed_records(existing: dict, records: list) -> list:
+    # Keep the last submission per roll number and drop the ones already stored as-is,
+    # so re-saving an unchanged register writes nothing
+    latest = {record[0]: record for record in records}
+    changed = []
+    for roll_number, branch, year, status in latest.values():
+        before = existing.get(roll_number)
+        if before and (before["branch"], before["year"], before["status"]) == (branch, year, status):
+            continue
+        changed.append((roll_number, branch, year, status))
+    return changed
+
+
+def _decode(code: str) -> str:
+    for status, status_code in STATUS_CODES.items():
+        if code == status_code:
+            return status
+    return code
+
+
+STORES = {"records": RecordStore(), "class_days": ClassDayStore()}
+
+
+def get_attendance_store():
+    return STORES[settings.ATTENDANCE_STORAGE]
+
+
+async def convert(database, target: str):
+    # Copy every mark into the other layout; the source collection is left untouched
+    if target == "class_days":
+        pipeline = [
+            {"$group": {
+                "_id": {"date": "$date", "branch": "$branch", "year": "$year"},
+                "statuses": {"$push": {
+                    "k": "$student_roll_number",
+                    "v": {"$switch": {
+                        "branches": [{"case": {"$eq": ["$status", status]}, "then": code} for status, code in STATUS_CODES.items()],
+                        "default": "$status",
+                    }},
+                }},
+                "marked_by": {"$last": "$marked_by"},
+                "created_at": {"$min": "$created_at"},
+                "updated_at": {"$max": "$updated_at"},
+            }},
+            {"$project": {
+                "_id": 0,
+                "date": "$_id.date",
+                "branch": "$_id.branch",
+                "year": "$_id.year",
+                "statuses": {"$arrayToObject": "$statuses"},
+                "marked_by": 1,
+                "created_at": 1,
+                "updated_at": 1,
+            }},
+            {"$merge": {"into": ClassDayStore.collection, "on": list(CLASS_FIELDS), "whenMatched": "merge", "whenNotMatched": "insert"}},
+        ]
+        await database[RecordStore.collection].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    else:
+        pipeline = STORES["class_days"].record_pipeline({}) + [
+            {"$unset": "_id"},
+            {"$merge": {"into": RecordStore.collection, "on": ["student_roll_number", "date"], "whenMatched": "merge", "whenNotMatched": "insert"}},
+        ]
+        await database[ClassDayStore.collection].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    await bump_versions(database, "attendance")
+
+
+async def main(argv) -> int:
+    from app.database.connection import db
+
+    if len(argv) != 2 or argv[0] != "convert" or argv[1] not in STORES:
+        print("usage: python -m app.database.attendance_store convert records|class_days")
+        return 2
+    await convert(db, argv[1])
+    print(f"[attendance_store] copied attendance into the {argv[1]} layout, set ATTENDANCE_STORAGE={argv[1]} to use it")
+    return 0
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m app.database.attendance_store convert class_days
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,50 @@
+from itertools import islice
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+def chunked(items, size: int):
+    # Yield lists of at most `size` items from any iterable
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+async def bulk_upsert(collection, key: str, documents: list, batch_size: int) -> dict:
+    # Upsert documents keyed on `key` through unordered bulk_write batches.
+    # Round trips grow with len(documents) / batch_size, not with the row count.
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0}
+
+    # Keep the first occurrence of a key, later duplicates in the same upload are rejected
+    seen = set()
+    unique_documents = []
+    for document in documents:
+        if not document.get(key) or document[key] in seen:
+            counts["rejected"] += 1
+            continue
+        seen.add(document[key])
+        unique_documents.append(document)
+
+    for batch in chunked(unique_documents, batch_size):
+        ops = [UpdateOne({key: doc[key]}, {"$set": doc}, upsert=True) for doc in batch]
+        try:
+            result = await collection.bulk_write(ops, ordered=False)
+            inserted = result.upserted_count
+            matched = result.matched_count
+            modified = result.modified_count
+        except BulkWriteError as e:
+            # Unordered writes keep going past failures, so count what did land
+            details = e.details
+            inserted = details.get("nUpserted", 0)
+            matched = details.get("nMatched", 0)
+            modified = details.get("nModified", 0)
+            counts["rejected"] += len(details.get("writeErrors", []))
+
+        counts["inserted"] += inserted
+        counts["updated"] += modified
+        counts["unchanged"] += matched - modified
+
+    return counts
@@ -1,5 +1,87 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
 from app.core.config import settings
+from app.core.metrics import MongoCommandListener
 
-client = AsyncIOMotorClient(settings.MONGODB_URL)
-db = client.get_database()
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+client = None
+_database = None
+_read_database = None
+
+
+def connect(existing_client=None, name: str = None, url: str = None):
+    # Called from the app lifespan; CLIs and scripts connect lazily on first use.
+    # existing_client lets tests and benchmarks plug in their own Motor-compatible client,
+    # url lets them target a server other than MONGODB_URL with the same client options.
+    global client, _database, _read_database
+    if existing_client is None:
+        options = {
+            "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+            "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+            "event_listeners": [MongoCommandListener()] if settings.METRICS_ENABLED else [],
+        }
+        if settings.MONGO_COMPRESSORS:
+            options["compressors"] = settings.MONGO_COMPRESSORS
+        existing_client = AsyncIOMotorClient(url or settings.MONGODB_URL, **options)
+
+    client = existing_client
+    _database = client[name] if name else client.get_database()
+    read_preference = READ_PREFERENCES[settings.REPORTING_READ_PREFERENCE]
+    if read_preference == ReadPreference.PRIMARY:
+        _read_database = _database
+    else:
+        _read_database = _database.with_options(read_preference=read_preference)
+    return _database
+
+
+async def warm_up():
+    # First round trip opens a connection; minPoolSize makes the driver fill the rest
+    await get_database().command("ping")
+
+
+def close():
+    global client, _database, _read_database
+    if client is not None:
+        client.close()
+    client = _database = _read_database = None
+
+
+def get_database():
+    if _database is None:
+        connect()
+    return _database
+
+
+def get_read_database():
+    # Secondary-preferred (per REPORTING_READ_PREFERENCE) handle for reporting reads
+    if _read_database is None:
+        connect()
+    return _read_database
+
+
+class _DatabaseProxy:
+    # Module-level handle that always points at the current client, so
+    # `from app.database.connection import db` keeps working across connect/close
+    def __init__(self, resolve):
+        self._resolve = resolve
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+
+db = _DatabaseProxy(get_database)
+read_db = _DatabaseProxy(get_read_database)
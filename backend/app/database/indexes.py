@@ -0,0 +1,164 @@
+import sys
+import asyncio
+from datetime import datetime
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import OperationFailure
+
+# Every index the routers rely on, per collection. Names are part of the
+# declaration so drift checks can tell a changed index from a missing one.
+INDEXES = {
+    "attendance": [
+        # mark_attendance upserts on (student_roll_number, date)
+        IndexModel([("student_roll_number", ASCENDING), ("date", ASCENDING)], name="roll_date", unique=True),
+        # get_attendance / export / analytics filter on branch, year and date
+        IndexModel([("branch", ASCENDING), ("year", ASCENDING), ("date", ASCENDING)], name="branch_year_date"),
+        IndexModel([("date", ASCENDING)], name="date"),
+    ],
+    "attendance_class_days": [
+        # Layout used when ATTENDANCE_STORAGE=class_days, one document per class per day
+        IndexModel([("date", ASCENDING), ("branch", ASCENDING), ("year", ASCENDING)], name="date_branch_year", unique=True),
+        IndexModel([("branch", ASCENDING), ("year", ASCENDING), ("date", ASCENDING)], name="branch_year_date"),
+    ],
+    "attendance_archive": [
+        # Closed terms, class-day documents written by app/database/archive.py
+        IndexModel([("date", ASCENDING), ("branch", ASCENDING), ("year", ASCENDING)], name="date_branch_year", unique=True),
+        IndexModel([("branch", ASCENDING), ("year", ASCENDING), ("date", ASCENDING)], name="branch_year_date"),
+    ],
+    "attendance_summaries": [
+        # Upserted by mark_attendance, read by get_analytics
+        IndexModel([("date", ASCENDING), ("branch", ASCENDING), ("year", ASCENDING)], name="date_branch_year", unique=True),
+        IndexModel([("branch", ASCENDING), ("year", ASCENDING), ("date", ASCENDING)], name="branch_year_date"),
+    ],
+    "roster_summaries": [
+        IndexModel([("branch", ASCENDING), ("year", ASCENDING)], name="branch_year", unique=True),
+    ],
+    "attendance_events": [
+        # Live feed relay (LIVE_FEED_SOURCE=change_stream), only recent events matter
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=3600),
+    ],
+    "jobs": [
+        # Workers claim the oldest queued job
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        # Finished jobs are purged after JOB_RETENTION_SECONDS
+        IndexModel([("status", ASCENDING), ("finished_at", ASCENDING)], name="status_finished_at"),
+    ],
+    "students": [
+        IndexModel([("roll_number", ASCENDING)], name="roll_number", unique=True),
+        IndexModel([("branch", ASCENDING), ("year", ASCENDING)], name="branch_year"),
+    ],
+    "users": [
+        # Looked up on every authenticated request
+        IndexModel([("username", ASCENDING)], name="username", unique=True),
+        IndexModel([("role", ASCENDING)], name="role"),
+    ],
+}
+
+# Representative filters issued by the routers, used to verify query plans
+_SAMPLE_DATE = datetime(2000, 1, 1)
+QUERY_SHAPES = [
+    ("attendance", {"student_roll_number": "", "date": _SAMPLE_DATE}),
+    ("attendance", {"date": _SAMPLE_DATE, "branch": "", "year": 0}),
+    ("attendance", {"branch": "", "year": 0}),
+    ("attendance", {"date": _SAMPLE_DATE}),
+    ("attendance_class_days", {"date": _SAMPLE_DATE, "branch": "", "year": 0}),
+    ("attendance_class_days", {"branch": "", "year": 0}),
+    ("attendance_summaries", {"date": _SAMPLE_DATE, "branch": "", "year": 0}),
+    ("attendance_summaries", {"date": _SAMPLE_DATE}),
+    ("attendance_summaries", {"branch": "", "year": 0}),
+    ("roster_summaries", {"branch": "", "year": 0}),
+    ("students", {"roll_number": ""}),
+    ("students", {"branch": "", "year": 0}),
+    ("students", {"branch": ""}),
+    ("users", {"username": ""}),
+    ("users", {"role": "admin"}),
+]
+
+
+def _declared(model: IndexModel) -> dict:
+    document = model.document
+    return {
+        "key": list(document["key"].items()),
+        "unique": bool(document.get("unique", False)),
+    }
+
+
+async def ensure_indexes(database) -> dict:
+    # create_indexes is a no-op for indexes that already exist with the same spec
+    errors = {}
+    for collection, models in INDEXES.items():
+        try:
+            await database[collection].create_indexes(models)
+        except OperationFailure as e:
+            errors[collection] = str(e)
+    return errors
+
+
+async def index_drift(database) -> dict:
+    # Compare live indexes against the catalogue: missing, changed and unmanaged ones
+    drift = {}
+    for collection, models in INDEXES.items():
+        existing = {}
+        async for index in database[collection].list_indexes():
+            existing[index["name"]] = {
+                "key": list(index["key"].items()),
+                "unique": bool(index.get("unique", False)),
+            }
+        existing.pop("_id_", None)
+
+        declared = {model.document["name"]: _declared(model) for model in INDEXES[collection]}
+        report = {
+            "missing": sorted(name for name in declared if name not in existing),
+            "changed": sorted(name for name in declared if name in existing and existing[name] != declared[name]),
+            "unmanaged": sorted(name for name in existing if name not in declared),
+        }
+        if any(report.values()):
+            drift[collection] = report
+    return drift
+
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+async def collection_scans(database) -> list:
+    # Explain each router query shape and return the ones that fall back to COLLSCAN
+    scans = []
+    for collection, query in QUERY_SHAPES:
+        explain = await database[collection].find(query).explain()
+        if "COLLSCAN" in _stages(explain.get("queryPlanner", {})):
+            scans.append({"collection": collection, "filter": list(query)})
+    return scans
+
+
+async def main(argv) -> int:
+    from app.database.connection import db
+
+    errors = await ensure_indexes(db)
+    drift = await index_drift(db)
+    for collection, error in errors.items():
+        print(f"[indexes] {collection}: failed to create indexes: {error}")
+    for collection, report in drift.items():
+        print(f"[indexes] {collection}: drift {report}")
+
+    failed = bool(errors)
+    if "--check" in argv:
+        scans = await collection_scans(db)
+        for scan in scans:
+            print(f"[indexes] COLLSCAN on {scan['collection']} for filter {scan['filter']}")
+        failed = failed or bool(drift) or bool(scans)
+
+    if not failed:
+        print("[indexes] OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m app.database.indexes [--check]
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,43 @@
+import os
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+# Leased locks shared by every worker process and host:
+#   {"_id": <lock name>, "owner": "<host>:<pid>", "acquired_at", "expires_at"}
+# A holder that dies without releasing only blocks others until the lease runs out.
+LOCKS_COLLECTION = "locks"
+
+
+def lock_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def acquire_lock(database, name: str, lease_seconds: int) -> bool:
+    # Matches only an expired lock; otherwise the upsert collides on _id with
+    # the live holder and we lose, so two workers can never both get it
+    now = datetime.utcnow()
+    try:
+        await database[LOCKS_COLLECTION].update_one(
+            {"_id": name, "expires_at": {"$lt": now}},
+            {"$set": {
+                "owner": lock_owner(),
+                "acquired_at": now,
+                "expires_at": now + timedelta(seconds=lease_seconds),
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release_lock(database, name: str):
+    await database[LOCKS_COLLECTION].delete_one({"_id": name, "owner": lock_owner()})
+
+
+async def wait_for_lock(database, name: str, poll_seconds: float = 0.5):
+    # Returns once the current holder releases the lock or its lease expires
+    while await database[LOCKS_COLLECTION].find_one({"_id": name, "expires_at": {"$gte": datetime.utcnow()}}):
+        await asyncio.sleep(poll_seconds)
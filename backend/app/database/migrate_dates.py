@@ -0,0 +1,106 @@
+import sys
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.utils.dates import day_bucket
+from app.database.summaries import rebuild_attendance_summaries
+
+# Rewrites attendance.date to day buckets (see app/utils/dates.py). Only the
+# "records" layout predates day buckets, so this works on `attendance` directly.
+# Progress is checkpointed in the `migrations` collection after every batch,
+# so an interrupted run picks up where it stopped.
+MIGRATION_ID = "attendance_day_buckets"
+DUPLICATE_KEY = 11000
+
+
+def _stored_day(value: datetime) -> datetime:
+    # Mongo returns naive UTC, and new marks are bucketed from UTC (the frontend
+    # sends ...Z), so convert the same way. Exact midnights are already buckets
+    # or calendar days, which day_bucket keeps as well, so they stay as they are
+    # and reruns are idempotent
+    if value == datetime(value.year, value.month, value.day):
+        return value
+    return day_bucket(value.replace(tzinfo=timezone.utc))
+
+
+async def _merge_into_bucket(database, doc, bucket):
+    # Another record already holds (roll number, day): keep the most recent mark
+    target = await database.attendance.find_one({"student_roll_number": doc["student_roll_number"], "date": bucket})
+    if target is None:
+        await database.attendance.update_one({"_id": doc["_id"]}, {"$set": {"date": bucket}})
+        return
+    if doc.get("updated_at") and (not target.get("updated_at") or doc["updated_at"] > target["updated_at"]):
+        fields = {key: doc[key] for key in ("branch", "year", "status", "marked_by", "updated_at") if key in doc}
+        await database.attendance.update_one({"_id": target["_id"]}, {"$set": fields})
+    if doc.get("created_at") and (not target.get("created_at") or doc["created_at"] < target["created_at"]):
+        await database.attendance.update_one({"_id": target["_id"]}, {"$set": {"created_at": doc["created_at"]}})
+    await database.attendance.delete_one({"_id": doc["_id"]})
+
+
+async def migrate(database, batch_size: int, restart: bool = False) -> dict:
+    if restart:
+        await database.migrations.delete_one({"_id": MIGRATION_ID})
+    state = await database.migrations.find_one({"_id": MIGRATION_ID}) or {}
+    last_id = state.get("last_id")
+    counts = {"scanned": state.get("scanned", 0), "rewritten": state.get("rewritten", 0), "merged": state.get("merged", 0)}
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id else {}
+        batch = await database.attendance.find(query, {"date": 1, "student_roll_number": 1}).sort("_id", 1).limit(batch_size).to_list(length=None)
+        if not batch:
+            break
+
+        buckets = {doc["_id"]: _stored_day(doc["date"]) for doc in batch}
+        pending = {doc["_id"]: buckets[doc["_id"]] for doc in batch if doc["date"] != buckets[doc["_id"]]}
+        pending_ids = list(pending)
+        ops = [UpdateOne({"_id": _id}, {"$set": {"date": pending[_id]}}) for _id in pending_ids]
+        conflicts = []
+        if ops:
+            try:
+                result = await database.attendance.bulk_write(ops, ordered=False)
+                counts["rewritten"] += result.modified_count
+            except BulkWriteError as e:
+                counts["rewritten"] += e.details.get("nModified", 0)
+                for error in e.details.get("writeErrors", []):
+                    if error["code"] != DUPLICATE_KEY:
+                        raise
+                    conflicts.append(pending_ids[error["index"]])
+
+        for _id in conflicts:
+            doc = await database.attendance.find_one({"_id": _id})
+            await _merge_into_bucket(database, doc, _stored_day(doc["date"]))
+            counts["merged"] += 1
+
+        counts["scanned"] += len(batch)
+        last_id = batch[-1]["_id"]
+        await database.migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"last_id": last_id, **counts}},
+            upsert=True
+        )
+        print(f"[migrate_dates] scanned={counts['scanned']} rewritten={counts['rewritten']} merged={counts['merged']}")
+
+    # Summaries are keyed by date, rebuild them on the new buckets
+    await rebuild_attendance_summaries(database)
+    await database.migrations.update_one({"_id": MIGRATION_ID}, {"$set": {"completed": True}}, upsert=True)
+    return counts
+
+
+async def main(argv) -> int:
+    from app.database.connection import db
+
+    parser = argparse.ArgumentParser(prog="python -m app.database.migrate_dates")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args(argv)
+
+    counts = await migrate(db, args.batch_size, args.restart)
+    print(f"[migrate_dates] done {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m app.database.migrate_dates
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,62 @@
+import time
+import asyncio
+from app.core.config import settings
+from app.database.versions import current_versions
+
+# The students collection only changes through roster imports, which bump the
+# "students" epoch in cache_versions. Each process keeps the whole roster in
+# memory and reloads it when that version moves, so mark_attendance and
+# /api/students/lookup resolve roll numbers without a query per request.
+ROSTER_SCOPES = [("students", None, None, None)]
+ROSTER_PROJECTION = {"_id": 0, "roll_number": 1, "name": 1, "branch": 1, "year": 1}
+
+
+class RosterIndex:
+
+    def __init__(self):
+        self.students = {} # roll number -> {"roll_number", "name", "branch", "year"}
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, database):
+        students = {}
+        async for doc in database.students.find({}, ROSTER_PROJECTION):
+            students[doc["roll_number"]] = doc
+        # Swap the map in one step so readers never see a half-built index
+        self.students = students
+
+    async def ensure_fresh(self, database):
+        # Version check at most every ROSTER_CHECK_SECONDS; imports in this process
+        # call invalidate() so their own changes are visible immediately
+        if self.version is not None and time.monotonic() - self._checked_at < settings.ROSTER_CHECK_SECONDS:
+            return
+        async with self._lock:
+            if self.version is not None and time.monotonic() - self._checked_at < settings.ROSTER_CHECK_SECONDS:
+                return
+            version = await current_versions(database, ROSTER_SCOPES)
+            if version != self.version:
+                await self.refresh(database)
+                self.version = version
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        self.version = None
+
+    def get(self, roll_number: str):
+        return self.students.get(roll_number)
+
+    def lookup(self, roll_numbers) -> tuple:
+        # Returns ({roll number: student}, [unknown roll numbers]) in request order
+        found = {}
+        missing = []
+        for roll_number in dict.fromkeys(roll_numbers):
+            student = self.students.get(roll_number)
+            if student is None:
+                missing.append(roll_number)
+            else:
+                found[roll_number] = student
+        return found, missing
+
+
+roster_index = RosterIndex()
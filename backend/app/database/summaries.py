@@ -0,0 +1,247 @@
+import sys
+import asyncio
+from datetime import datetime
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.database.attendance_store import get_attendance_store
+from app.database.archive import read_store
+from app.database.versions import bump_versions
+
+# Materialized counts kept next to the raw collections:
+#   attendance_summaries: one document per (date, branch, year) with present/absent/other/total
+#   roster_summaries:     one document per (branch, year) with the number of students
+COUNT_FIELDS = ["present", "absent", "other", "total"]
+
+
+def _count_group(key: dict) -> dict:
+    return {"$group": {
+        "_id": key,
+        "present": {"$sum": {"$cond": [{"$eq": ["$status", "Present"]}, 1, 0]}},
+        "absent": {"$sum": {"$cond": [{"$eq": ["$status", "Absent"]}, 1, 0]}},
+        "total": {"$sum": 1},
+    }}
+
+
+async def refresh_class_summaries(database, date: datetime, classes) -> dict:
+    # Recount the given (branch, year) classes for one day from the raw marks, after a
+    # write. Unlike increments derived from a read taken before the write, this stays
+    # exact when two submits for the same class-day race. Each summary keeps the time
+    # its count started, and an older count never overwrites a newer one.
+    # Returns {(branch, year): {"present": n, ...}}, how far each summary moved
+    classes = set(classes)
+    if not classes:
+        return {}
+    started = datetime.utcnow()
+    store = get_attendance_store()
+    match = {
+        "date": date,
+        "branch": {"$in": sorted({branch for branch, _ in classes})},
+        "year": {"$in": sorted({year for _, year in classes})},
+    }
+    pipeline = store.record_pipeline(match) + [_count_group({"branch": "$branch", "year": "$year"})]
+    counts = {(branch, year): dict.fromkeys(COUNT_FIELDS, 0) for branch, year in classes}
+    async for item in database[store.collection].aggregate(pipeline):
+        key = (item["_id"]["branch"], item["_id"]["year"])
+        if key in counts:
+            counts[key] = {
+                "present": item["present"],
+                "absent": item["absent"],
+                "other": item["total"] - item["present"] - item["absent"],
+                "total": item["total"],
+            }
+
+    deltas = {}
+    for (branch, year), counters in counts.items():
+        try:
+            before = await database.attendance_summaries.find_one_and_update(
+                {
+                    "date": date, "branch": branch, "year": year,
+                    "$or": [{"counted_at": {"$lt": started}}, {"counted_at": {"$exists": False}}],
+                },
+                {"$set": {**counters, "counted_at": started, "updated_at": datetime.utcnow()}},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # A count that started later has already been stored
+            continue
+        before = before or {}
+        moved = {field: counters[field] - before.get(field, 0) for field in COUNT_FIELDS}
+        if any(moved.values()):
+            deltas[(branch, year)] = moved
+    return deltas
+
+
+async def refresh_roster_summaries(database):
+    # Recount students per (branch, year); cheap on the (branch, year) index
+    pipeline = [{"$group": {"_id": {"branch": "$branch", "year": "$year"}, "students": {"$sum": 1}}}]
+    counts = await database.students.aggregate(pipeline).to_list(length=None)
+    timestamp = datetime.utcnow()
+    ops = [
+        UpdateOne(
+            {"branch": item["_id"]["branch"], "year": item["_id"]["year"]},
+            {"$set": {"students": item["students"], "updated_at": timestamp}},
+            upsert=True
+        )
+        for item in counts
+    ]
+    if ops:
+        await database.roster_summaries.bulk_write(ops, ordered=False)
+    # Classes that no longer have any students
+    await database.roster_summaries.delete_many({"updated_at": {"$lt": timestamp}})
+
+
+async def rebuild_attendance_summaries(database):
+    # Recompute every (date, branch, year) summary from the raw attendance records,
+    # hot and archived
+    store = await read_store(database)
+    pipeline = store.record_pipeline({}) + [
+        _count_group({"date": "$date", "branch": "$branch", "year": "$year"}),
+        {"$project": {
+            "_id": 0,
+            "date": "$_id.date",
+            "branch": "$_id.branch",
+            "year": "$_id.year",
+            "present": 1,
+            "absent": 1,
+            "other": {"$subtract": ["$total", {"$add": ["$present", "$absent"]}]},
+            "total": 1,
+            "updated_at": "$$NOW",
+        }},
+        {"$out": "attendance_summaries"},
+    ]
+    await database[store.collection].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    # Also run after migrations that rewrite attendance in place
+    await bump_versions(database, "attendance")
+
+
+async def ensure_summaries(database):
+    # First start after upgrading: build the summaries once from existing data
+    store = get_attendance_store()
+    if await database.attendance_summaries.find_one() is None and await database[store.collection].find_one() is not None:
+        await rebuild_attendance_summaries(database)
+    if await database.roster_summaries.find_one() is None and await database.students.find_one() is not None:
+        await refresh_roster_summaries(database)
+
+
+async def read_analytics(database, date=None, branch=None, year=None) -> dict:
+    class_query = {}
+    if branch:
+        class_query["branch"] = branch
+    if year:
+        class_query["year"] = year
+
+    summary_query = dict(class_query)
+    if date:
+        summary_query["date"] = date
+
+    totals = dict.fromkeys(COUNT_FIELDS, 0)
+    async for summary in database.attendance_summaries.find(summary_query, {"_id": 0, **dict.fromkeys(COUNT_FIELDS, 1)}):
+        for field in COUNT_FIELDS:
+            totals[field] += summary.get(field, 0)
+
+    total_students = 0
+    async for roster in database.roster_summaries.find(class_query, {"_id": 0, "students": 1}):
+        total_students += roster["students"]
+
+    return {
+        "total_students": total_students,
+        "present_count": totals["present"],
+        "absent_count": totals["absent"],
+    }
+
+
+def student_summary_pipeline(match: dict, below=None, store=None) -> list:
+    # Per-roll-number attended/total/percentage over the matched marks, joined to the
+    # student's name; `below` keeps only students under that percentage.
+    # Run it on store.collection, store as returned by archive.read_store()
+    store = store or get_attendance_store()
+    pipeline = store.record_pipeline(match) + [
+        {"$group": {
+            "_id": "$student_roll_number",
+            "branch": {"$last": "$branch"},
+            "year": {"$last": "$year"},
+            "attended": {"$sum": {"$cond": [{"$eq": ["$status", "Present"]}, 1, 0]}},
+            "total": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": 0,
+            "roll_number": "$_id",
+            "branch": 1,
+            "year": 1,
+            "attended": 1,
+            "total": 1,
+            "percentage": {"$round": [{"$multiply": [{"$divide": ["$attended", "$total"]}, 100]}, 2]},
+        }},
+    ]
+    if below is not None:
+        pipeline.append({"$match": {"percentage": {"$lt": below}}})
+    pipeline += [
+        {"$sort": {"roll_number": 1}},
+        {"$lookup": {
+            "from": "students",
+            "localField": "roll_number",
+            "foreignField": "roll_number",
+            "as": "student",
+        }},
+        {"$addFields": {"name": {"$arrayElemAt": ["$student.name", 0]}}},
+        {"$project": {"student": 0}},
+    ]
+    return pipeline
+
+
+def _rate(present: int, total: int):
+    return round(present / total * 100, 2) if total else None
+
+
+async def read_trends(database, unit: str, date=None, branch=None, year=None, window: int = 7) -> list:
+    # Attendance rate per (branch, year) per day/week/month from the daily summaries,
+    # bucketed in one aggregation. Weeks start on Monday. Returns one series per
+    # class with a trailing moving average of the rate over `window` periods.
+    match = {}
+    if date:
+        match["date"] = date
+    if branch:
+        match["branch"] = branch
+    if year:
+        match["year"] = year
+
+    period = "$date" if unit == "day" else {"$dateTrunc": {"date": "$date", "unit": unit, "startOfWeek": "monday"}}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"branch": "$branch", "year": "$year", "period": period},
+            **{field: {"$sum": f"${field}"} for field in COUNT_FIELDS},
+        }},
+        {"$sort": {"_id.branch": 1, "_id.year": 1, "_id.period": 1}},
+    ]
+
+    series = {}
+    async for bucket in database.attendance_summaries.aggregate(pipeline):
+        key = (bucket["_id"]["branch"], bucket["_id"]["year"])
+        points = series.setdefault(key, [])
+        point = {"period": bucket["_id"]["period"], **{field: bucket[field] for field in COUNT_FIELDS}}
+        point["rate"] = _rate(point["present"], point["total"])
+        # Pooled over the window so short days don't weigh as much as full ones
+        recent = points[-(window - 1):] + [point] if window > 1 else [point]
+        point["moving_average"] = _rate(sum(p["present"] for p in recent), sum(p["total"] for p in recent))
+        points.append(point)
+
+    return [{"branch": branch, "year": year, "points": points} for (branch, year), points in series.items()]
+
+
+async def main(argv) -> int:
+    from app.database.connection import db
+
+    if argv[:1] != ["rebuild"]:
+        print("usage: python -m app.database.summaries rebuild")
+        return 2
+    await rebuild_attendance_summaries(db)
+    await refresh_roster_summaries(db)
+    print("[summaries] rebuilt attendance_summaries and roster_summaries")
+    return 0
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m app.database.summaries rebuild
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,46 @@
+from itertools import product
+from pymongo import UpdateOne
+
+# Data version counters, one document per (collection, branch, year, date) scope:
+#   {"_id": {"collection": "attendance", "branch": "CSE", "year": 3, "date": <day>}, "version": n}
+# None stands for "any", so a read filtered on branch only depends on the
+# {"branch": b, "year": None, "date": None} counter. Writers bump every scope
+# that covers the classes they touched; readers fold the counters into cache keys.
+VERSIONS_COLLECTION = "cache_versions"
+
+
+def scope_id(collection: str, branch=None, year=None, date=None) -> dict:
+    # Field order matters for _id equality, so always build it here
+    return {"collection": collection, "branch": branch or None, "year": year or None, "date": date}
+
+
+def covering_scopes(collection: str, classes, date=None) -> list:
+    # Every scope a read could use that includes one of the (branch, year) classes on `date`
+    scopes = {}
+    for branch, year in classes:
+        for scope in product((branch, None), (year, None), (date, None) if date else (None,)):
+            scopes[scope] = scope_id(collection, *scope)
+    return list(scopes.values())
+
+
+def epoch_id(collection: str) -> dict:
+    # Bumped when a whole collection changes; part of every read of that collection
+    return {"collection": collection, "epoch": True}
+
+
+async def bump_versions(database, collection: str, classes=None, date=None):
+    # classes=None invalidates every scope of the collection (bulk imports, migrations)
+    ids = [epoch_id(collection)] if classes is None else covering_scopes(collection, classes, date)
+    ops = [UpdateOne({"_id": _id}, {"$inc": {"version": 1}}, upsert=True) for _id in ids]
+    if ops:
+        await database[VERSIONS_COLLECTION].bulk_write(ops, ordered=False)
+
+
+async def current_versions(database, scopes: list) -> tuple:
+    # scopes: [(collection, branch, year, date)]; counters not written yet read as 0
+    ids = [scope_id(*scope) for scope in scopes]
+    ids += [epoch_id(collection) for collection in dict.fromkeys(scope[0] for scope in scopes)]
+    found = {}
+    async for doc in database[VERSIONS_COLLECTION].find({"_id": {"$in": ids}}):
+        found[tuple(doc["_id"].items())] = doc["version"]
+    return tuple(found.get(tuple(_id.items()), 0) for _id in ids)
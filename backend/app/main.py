@@ -1,9 +1,74 @@
+import importlib
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
-from app.routers import auth, students, attendance
+from app.core.serialization import MongoJSONResponse
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.api.deps import user_cache
+from app.core.response_cache import response_cache
+from app.routers import auth, students, attendance, jobs
+from app.core.jobs import start_workers, stop_workers
+from app.core.live_feed import broadcaster
+from app.utils.excel_handler import preload_parser, shutdown_parse_pool
+from app.database import connection
+from app.database.connection import db
+from app.database.indexes import ensure_indexes, index_drift
+from app.database.locks import acquire_lock, release_lock, wait_for_lock
+from app.database.summaries import ensure_summaries
 
-app = FastAPI(title="Attendance Management Portal")
+async def create_indexes():
+    if not settings.CREATE_INDEXES_ON_STARTUP:
+        return
+    errors = await ensure_indexes(db)
+    for collection, error in errors.items():
+        print(f"Index creation failed for {collection}: {error}")
+    for collection, report in (await index_drift(db)).items():
+        print(f"Index drift on {collection}: {report}")
+
+async def run_startup_tasks():
+    # With several workers starting at once, one of them builds indexes, backfills
+    # summaries and seeds the admin while the others wait for it to finish. The
+    # tasks are idempotent, so a later start (or a lost lease) re-running them is harmless.
+    if not await acquire_lock(db, "startup", settings.STARTUP_LOCK_SECONDS):
+        await wait_for_lock(db, "startup")
+        return
+    try:
+        await create_indexes()
+        await ensure_summaries(db)
+        await auth.create_initial_admin()
+    finally:
+        await release_lock(db, "startup")
+
+def preload_heavy_modules():
+    preload_parser()
+    importlib.import_module("openpyxl") # xlsx exports
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Motor client per process, created inside the running loop and closed on shutdown
+    if connection.client is None:
+        connection.connect()
+    await connection.warm_up()
+    await run_startup_tasks()
+    if settings.PRELOAD_HEAVY_IMPORTS:
+        await run_in_threadpool(preload_heavy_modules)
+    start_workers()
+    broadcaster.start()
+    yield
+    await broadcaster.stop()
+    await stop_workers()
+    shutdown_parse_pool()
+    connection.close()
+
+app = FastAPI(
+    title="Attendance Management Portal",
+    lifespan=lifespan,
+    # orjson-based encoding for every route when the fast path is enabled
+    default_response_class=MongoJSONResponse if settings.FAST_LIST_RESPONSES else JSONResponse,
+)
 
 # CORS Middleware
 app.add_middleware(
@@ -12,8 +77,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Disposition", "ETag"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        cache = user_cache.stats()
+        responses = response_cache.stats()
+        gauges = {
+            "user_cache_entries": cache["size"],
+            "response_cache_entries": responses["size"],
+        }
+        counters = {
+            "user_cache_hits_total": cache["hits"],
+            "user_cache_misses_total": cache["misses"],
+            "response_cache_hits_total": responses["hits"],
+            "response_cache_misses_total": responses["misses"],
+        }
+        return PlainTextResponse(render_metrics(gauges, counters), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def read_root():
     return {"message": "Attendance Management Portal API is running"}
@@ -21,3 +106,4 @@ def read_root():
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(students.router, prefix="/api/students", tags=["Students"])
 app.include_router(attendance.router, prefix="/api/attendance", tags=["Attendance"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
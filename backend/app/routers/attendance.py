@@ -1,170 +1,425 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse, JSONResponse
 from typing import List, Optional
-from datetime import datetime, date
-from app.api.deps import get_current_active_user, get_current_admin_user
+from datetime import datetime, date, timedelta, timezone
+from app.api.deps import get_current_active_user, get_current_admin_user, get_stream_user
 from app.models.attendance import Attendance
 from app.models.student import Student
-from app.schemas.attendance import AttendanceRequest, AttendanceResponse
+from app.schemas.attendance import AttendanceRequest, AttendanceResponse, StudentAttendanceSummary, TrendsResponse
 from app.schemas.user import UserResponse
-from app.database.connection import db
-import pandas as pd
-from io import BytesIO
+from app.database.connection import db, read_db
+from app.database.attendance_store import get_attendance_store, changed_records
+from app.database.summaries import refresh_class_summaries, read_analytics, read_trends, student_summary_pipeline
+from app.database.versions import bump_versions
+from app.database.roster import roster_index
+from app.database.archive import archived_before, read_store, archive_terms
+from app.core.config import settings
+from app.core.jobs import job_handler, submit_job
+from app.core.serialization import fast_lists_enabled, ATTENDANCE_PROJECTION
+from app.core.response_cache import CachedRoute, cached_response
+from app.core.live_feed import broadcaster, publish_deltas, event_stream
+from app.utils.export_writer import cursor_batches, WRITERS, MEDIA_TYPES
+from app.utils.dates import day_bucket, date_condition
+from app.utils.excel_handler import parse_register_file_async, MAX_REPORTED_ERRORS
+from app.utils.pagination import fetch_page, wants_ndjson, ndjson_response
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
 
-from pymongo import UpdateOne
+MAX_REPORTED_UNKNOWN = 20
+
+# Per granularity: default range when `from` is omitted, and moving average window
+TREND_DEFAULT_DAYS = {"day": 30, "week": 84, "month": 365}
+TREND_WINDOWS = {"day": 7, "week": 4, "month": 3}
+
+async def write_day(attendance_date: datetime, records: list, marked_by: str, timestamp: datetime):
+    # Writes one day's (roll, branch, year, status) records; shared by mark_attendance
+    # and register imports. Returns (counts, changed records)
+    counts = {"matched": 0, "modified": 0, "upserted": 0}
+    changed = []
+    if not records:
+        return counts, changed
+    # Upserts go through the attendance store, which hides the storage layout.
+    # Current statuses for the class-day are fetched in one query so only marks that
+    # differ are written; the daily summaries are then recounted from the raw marks
+    store = get_attendance_store()
+    existing = await store.existing_statuses(db, attendance_date, {record[0] for record in records})
+    changed = changed_records(existing, records)
+    if changed:
+        counts = await store.write_marks(db, attendance_date, changed, existing, marked_by, timestamp)
+        # Every class with a changed record, including the one a student was moved out of
+        classes = {(branch, year) for _, branch, year, _ in changed}
+        classes |= {(existing[roll]["branch"], existing[roll]["year"]) for roll, *_ in changed if roll in existing}
+        deltas = await refresh_class_summaries(db, attendance_date, classes)
+        await bump_versions(db, "attendance", classes, attendance_date)
+        await publish_deltas(attendance_date, deltas)
+    return counts, changed
 
 @router.post("/mark", response_model=AttendanceResponse)
 async def mark_attendance(
     attendance_in: AttendanceRequest,
     current_user: UserResponse = Depends(get_current_active_user)
 ):
-    # Use bulk_write with upsert to handle multiple submissions for same day
-    bulk_ops = []
+    records = []
+    unknown = []
     timestamp = datetime.utcnow()
+    # Store the calendar day only so marks never split on time-of-day or timezone
+    attendance_date = day_bucket(attendance_in.date)
+    
+    boundary = await archived_before(db)
+    if boundary and attendance_date < boundary:
+        raise HTTPException(status_code=400, detail=f"Attendance before {boundary.date()} is archived (closed term)")
     
+    # Validate and enrich the whole batch against the in-memory roster
+    await roster_index.ensure_fresh(db)
     for item in attendance_in.attendance_data:
-        # Filter by student and date (assuming date is exact match provided by frontend)
-        # Ideally we should use date only (without time) logic but for simplicity we rely on frontend sending consistent ISO date
-        filter_query = {
-            "student_roll_number": item.student_roll_number,
-            "date": attendance_in.date
-        }
-        
-        # Determine branch/year from item first, fallback to top-level
-        # Logic: If item.branch is present, use it. Else use attendance_in.branch.
-        # This allows mixed batches to submit correct data.
-        
-        record_branch = item.branch if item.branch else attendance_in.branch
-        record_year = item.year if item.year > 0 else attendance_in.year
-
-        update_doc = {
-            "$set": {
-                "branch": record_branch,
-                "year": record_year,
-                "status": item.status,
-                "marked_by": str(current_user.id),
-                "updated_at": timestamp
-            },
-            "$setOnInsert": {
-                "created_at": timestamp
-            }
-        }
-        
-        bulk_ops.append(UpdateOne(filter_query, update_doc, upsert=True))
+        student = roster_index.get(item.student_roll_number)
+        if student is not None:
+            # The roster decides a student's class, whatever the client sent
+            records.append((item.student_roll_number, student["branch"], student["year"], item.status))
+        elif settings.ATTENDANCE_REQUIRE_ENROLLED:
+            unknown.append(item.student_roll_number)
+        else:
+            # Determine branch/year from item first, fallback to top-level
+            record_branch = item.branch if item.branch else attendance_in.branch
+            record_year = item.year if item.year > 0 else attendance_in.year
+            records.append((item.student_roll_number, record_branch, record_year, item.status))
+    
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown roll numbers ({len(unknown)}): {', '.join(unknown[:MAX_REPORTED_UNKNOWN])}"
+        )
         
-    if bulk_ops:
-        await db.attendance.bulk_write(bulk_ops)
+    try:
+        counts, changed = await write_day(attendance_date, records, str(current_user.id), timestamp)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
         
     return {
         "message": "Attendance marked successfully",
-        "date": attendance_in.date,
-        "marked_count": len(bulk_ops)
+        "date": attendance_date,
+        "marked_count": len(changed),
+        "matched_count": counts["matched"],
+        "modified_count": counts["modified"],
+        "upserted_count": counts["upserted"],
+        "skipped_count": len(records) - len(changed)
+    }
+
+async def import_register(content: bytes, filename: str, marked_by: str, branch: Optional[str] = None, year: Optional[int] = None) -> dict:
+    # Shared by the upload endpoint and the background attendance_register_import job.
+    # Cells are validated in the parser; here rows are matched to the roster and
+    # each day is written like one mark_attendance call
+    marks, errors = await parse_register_file_async(content, filename)
+    timestamp = datetime.utcnow()
+    boundary = await archived_before(db)
+    await roster_index.ensure_fresh(db)
+
+    days = {}
+    columns = {}
+    bad_rows = {}
+    bad_columns = {}
+    for day, roll_number, status, row, column in marks:
+        columns[day] = column
+        if boundary and day < boundary:
+            bad_columns[column] = f"attendance before {boundary.date()} is archived (closed term)"
+            continue
+        student = roster_index.get(roll_number)
+        if student is not None:
+            days.setdefault(day, []).append((roll_number, student["branch"], student["year"], status))
+        elif settings.ATTENDANCE_REQUIRE_ENROLLED or not (branch and year):
+            bad_rows[row] = roll_number
+        else:
+            days.setdefault(day, []).append((roll_number, branch, year, status))
+
+    written = marked = skipped = 0
+    for day in sorted(days):
+        try:
+            _, changed = await write_day(day, days[day], marked_by, timestamp)
+        except ValueError as e:
+            bad_columns[columns[day]] = str(e)
+            continue
+        written += 1
+        marked += len(changed)
+        skipped += len(days[day]) - len(changed)
+
+    errors += [{"row": row, "roll_number": roll_number, "errors": ["unknown ROLL NO"]} for row, roll_number in bad_rows.items()]
+    errors.sort(key=lambda error: error["row"])
+    errors = [{"column": column, "errors": [message]} for column, message in bad_columns.items()] + errors
+    return {
+        "days": written,
+        "marked": marked,
+        "skipped": skipped,
+        "rejected": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS],
+    }
+
+@job_handler("attendance_register_import")
+async def run_register_import(job):
+    params = job.params
+    return await import_register(
+        await job.read_input(), params["filename"], job.job["created_by"], params.get("branch"), params.get("year")
+    )
+
+@router.post("/upload", status_code=201)
+async def upload_register(
+    file: UploadFile = File(...),
+    branch: Optional[str] = None, # Class for roll numbers not in the roster, when ATTENDANCE_REQUIRE_ENROLLED is off
+    year: Optional[int] = None,
+    background: bool = False, # Queue the import as a job and return its id right away
+    current_user: UserResponse = Depends(get_current_active_user)
+):
+    # Register sheet: a ROLL NO column and one column per day (2024-01-31 or
+    # 31-01-2024) holding P or A; blank cells are left unmarked
+    if not file.filename.lower().endswith((".xlsx", ".xls", ".csv")):
+        raise HTTPException(status_code=400, detail="Invalid file format. Please upload an Excel or CSV file.")
+
+    content = await file.read()
+    if background:
+        params = {"filename": file.filename, "branch": branch, "year": year}
+        job_id = await submit_job("attendance_register_import", params, str(current_user.id), content, file.filename)
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status_url": f"/api/jobs/{job_id}"})
+
+    try:
+        counts = await import_register(content, file.filename, str(current_user.id), branch, year)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "message": f"Register imported. {counts['marked']} marks written over {counts['days']} days, {counts['skipped']} unchanged, {counts['rejected']} rejected.",
+        **counts
     }
 
 @router.get("/", response_model=List[Attendance])
 async def get_attendance(
+    request: Request,
+    response: Response,
     date: Optional[datetime] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
     branch: Optional[str] = None,
     year: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.LIST_PAGE_SIZE_MAX),
+    after: Optional[str] = None,
     current_user: UserResponse = Depends(get_current_active_user)
 ):
     query = {}
-    if date:
-        # Match the date exactly as we store what frontend sends
-        query["date"] = date
+    day = date_condition(date, date_from, date_to)
+    if day:
+        query["date"] = day
         
     if branch:
         query["branch"] = branch
     if year:
         query["year"] = year
         
-    # Find attendance records
-    attendance_cursor = db.attendance.find(query)
-    # attendance_list = await attendance_cursor.to_list(length=2000) # Increased limit
+    # JSON responses are pages (LIST_PAGE_SIZE_DEFAULT rows unless `limit` is given,
+    # next cursor in X-Next-Cursor); application/x-ndjson streams the whole result
+    fast = fast_lists_enabled()
+    projection = ATTENDANCE_PROJECTION if fast else None
+    store = await read_store(db, day)
+    if wants_ndjson(request):
+        return ndjson_response(store.find_records(read_db, query, limit, after, projection), settings.EXPORT_BATCH_SIZE)
+    
+    cached = await cached_response(request, [("attendance", branch, year, day_bucket(date) if date else None)])
+    if cached:
+        return cached
+    limit = limit or settings.LIST_PAGE_SIZE_DEFAULT
+    attendance_cursor = store.find_records(read_db, query, limit, after, projection)
+    return await fetch_page(attendance_cursor, response, limit, {} if fast else None)
+
+def export_query(date=None, date_from=None, date_to=None, branch=None, year=None) -> dict:
+    query = {}
+    day = date_condition(date, date_from, date_to)
+    if day:
+        query["date"] = day
+         
+    if branch:
+        query["branch"] = branch
+    if year:
+        query["year"] = year
+    return query
+
+@job_handler("attendance_export")
+async def run_attendance_export(job):
+    export_format = job.params["format"]
+    query = export_query(**job.params["filters"])
+    attendance_cursor = (await read_store(db, query.get("date"))).find_records(read_db, query)
+    rows = 0
     
-    # We might need to handle huge data if all branches + year selected. 
-    # But usually it's per day per class. Even 'All' branches is manageable (~500 students?)
-    attendance_list = await attendance_cursor.to_list(length=5000)
+    async def counted_batches():
+        nonlocal rows
+        async for batch in cursor_batches(attendance_cursor, settings.EXPORT_BATCH_SIZE):
+            rows += len(batch)
+            await job.progress(rows)
+            yield batch
     
-    return attendance_list
+    await job.save_result_file(
+        WRITERS[export_format]([], counted_batches()),
+        f"attendance_report.{export_format}",
+        MEDIA_TYPES[export_format]
+    )
+    return {"rows": rows}
 
 @router.get("/export")
 async def export_attendance(
     date: Optional[datetime] = None, # Added date filter
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
     branch: Optional[str] = None,
     year: Optional[int] = None,
+    export_format: str = Query("xlsx", alias="format", pattern="^(xlsx|csv|ndjson)$"),
+    background: bool = False, # Build the file in a job, download it from /api/jobs/{id}/result
     current_user: UserResponse = Depends(get_current_active_user) 
 ):
-    query = {}
-    if date:
-         query["date"] = date # Match exact date stored
-         
-    if branch:
-        query["branch"] = branch
-    if year:
-        query["year"] = year
-        
-    attendance_cursor = db.attendance.find(query)
-    data = await attendance_cursor.to_list(length=5000)
+    filters = {"date": date, "date_from": date_from, "date_to": date_to, "branch": branch, "year": year}
+    if background:
+        job_id = await submit_job("attendance_export", {"filters": filters, "format": export_format}, str(current_user.id))
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status_url": f"/api/jobs/{job_id}"})
     
-    if not data:
-        raise HTTPException(status_code=404, detail="No attendance data found for export")
-        
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
-    
-    # Select relevant columns
-    if "_id" in df.columns:
-        del df["_id"]
-        
-    # Generate Excel
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Attendance')
+    # Stream the cursor in batches instead of capping it with to_list
+    query = export_query(**filters)
+    attendance_cursor = (await read_store(db, query.get("date"))).find_records(read_db, query)
+    first_batch = await attendance_cursor.to_list(length=settings.EXPORT_BATCH_SIZE)
     
-    output.seek(0)
+    if not first_batch:
+        raise HTTPException(status_code=404, detail="No attendance data found for export")
     
     headers = {
-        'Content-Disposition': 'attachment; filename="attendance_report.xlsx"'
+        'Content-Disposition': f'attachment; filename="attendance_report.{export_format}"'
     }
-    return Response(content=output.getvalue(), headers=headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return StreamingResponse(
+        WRITERS[export_format](first_batch, cursor_batches(attendance_cursor, settings.EXPORT_BATCH_SIZE)),
+        headers=headers,
+        media_type=MEDIA_TYPES[export_format]
+    )
+
+@router.get("/students/summary", response_model=List[StudentAttendanceSummary])
+async def get_student_summary(
+    request: Request,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    branch: Optional[str] = None,
+    year: Optional[int] = None,
+    below: Optional[float] = Query(None, ge=0, le=100), # Only students under this percentage, e.g. 75
+    current_user: UserResponse = Depends(get_current_active_user)
+):
+    match = {}
+    day = date_condition(date_from=date_from, date_to=date_to)
+    if day:
+        match["date"] = day
+    if branch:
+        match["branch"] = branch
+    if year:
+        match["year"] = year
+    
+    # One server-side pass: per-roll-number counts joined to the student's name
+    store = await read_store(db, day)
+    pipeline = student_summary_pipeline(match, below, store)
+    summary_cursor = read_db[store.collection].aggregate(pipeline, allowDiskUse=True)
+    if wants_ndjson(request):
+        return ndjson_response(summary_cursor, settings.EXPORT_BATCH_SIZE)
+    return await summary_cursor.to_list(length=None)
 
 @router.get("/analytics")
 async def get_analytics(
+    request: Request,
     date: Optional[datetime] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
     branch: Optional[str] = None,
     year: Optional[int] = None,
     current_user: UserResponse = Depends(get_current_active_user) # Changed to active user
 ):
-    # Total students filtering
-    student_query = {}
-    if branch:
-        student_query["branch"] = branch
-    if year:
-        student_query["year"] = year
-        
-    total_students = await db.students.count_documents(student_query)
+    # Served from the materialized summaries kept up to date by mark_attendance
+    # and upload_students (see app/database/summaries.py)
+    cached = await cached_response(request, [
+        ("attendance", branch, year, day_bucket(date) if date else None),
+        ("students", branch, year, None),
+    ])
+    if cached:
+        return cached
+    return await read_analytics(read_db, date=date_condition(date, date_from, date_to), branch=branch, year=year)
+
+@router.get("/trends", response_model=TrendsResponse)
+async def get_trends(
+    request: Request,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"), # Defaults to today
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    branch: Optional[str] = None,
+    year: Optional[int] = None,
+    window: Optional[int] = Query(None, ge=1, le=90), # Periods in the moving average
+    threshold: float = Query(75, ge=0, le=100), # Percentage for the below-threshold list
+    current_user: UserResponse = Depends(get_current_active_user)
+):
+    end = day_bucket(date_to or datetime.now(timezone.utc))
+    start = day_bucket(date_from) if date_from else end - timedelta(days=TREND_DEFAULT_DAYS[granularity])
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    
+    cached = await cached_response(request, [
+        ("attendance", branch, year, None),
+        ("students", branch, year, None),
+    ], vary=end)
+    if cached:
+        return cached
+    
+    window = window or TREND_WINDOWS[granularity]
+    series = await read_trends(read_db, granularity, {"$gte": start, "$lte": end}, branch, year, window)
     
-    # Attendance filtering
-    attendance_match = {}
-    if date:
-        attendance_match["date"] = date
+    # Students under the threshold over the week that contains `end`
+    week_start = end - timedelta(days=end.weekday())
+    match = {"date": {"$gte": week_start, "$lte": week_start + timedelta(days=6)}}
     if branch:
-        attendance_match["branch"] = branch
+        match["branch"] = branch
     if year:
-        attendance_match["year"] = year
-        
-    pipeline = [
-        {"$match": attendance_match},
-        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-    ]
-    attendance_stats = await db.attendance.aggregate(pipeline).to_list(length=None)
-    
-    stats = {item["_id"]: item["count"] for item in attendance_stats}
+        match["year"] = year
+    store = await read_store(db, match["date"])
+    below_cursor = read_db[store.collection].aggregate(
+        student_summary_pipeline(match, threshold, store), allowDiskUse=True
+    )
     
     return {
-        "total_students": total_students,
-        "present_count": stats.get("Present", 0),
-        "absent_count": stats.get("Absent", 0)
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "window": window,
+        "series": series,
+        "threshold": threshold,
+        "week_start": week_start,
+        "below_threshold": await below_cursor.to_list(length=None),
     }
+
+@job_handler("attendance_archive")
+async def run_attendance_archive(job):
+    return await archive_terms(db, job.params["before"], job.progress)
+
+@router.post("/archive", status_code=202)
+async def archive_attendance(
+    before: date, # First day of the current term; every earlier day is closed
+    current_user: UserResponse = Depends(get_current_admin_user)
+):
+    # Runs as a job: the hot copies are only removed after ARCHIVE_GRACE_SECONDS
+    boundary = await archived_before(db)
+    if boundary and datetime.combine(before, datetime.min.time()) <= boundary:
+        raise HTTPException(status_code=400, detail=f"Attendance is already archived before {boundary.date()}")
+    job_id = await submit_job("attendance_archive", {"before": datetime.combine(before, datetime.min.time())}, str(current_user.id))
+    return {"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}
+
+@router.get("/live")
+async def live_attendance(
+    request: Request,
+    branch: Optional[str] = None,
+    year: Optional[int] = None,
+    current_user: UserResponse = Depends(get_stream_user)
+):
+    # Server-sent events: a "delta" per (date, branch, year) whose counts changed,
+    # "resync" when this client fell behind and should reload /analytics
+    subscription = broadcaster.subscribe(branch, year)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many live feed clients")
+    return StreamingResponse(
+        event_stream(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,25 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
-from app.core.security import create_access_token, get_password_hash, verify_password
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.security import (
+    create_access_token,
+    get_password_hash_async,
+    verify_password_async,
+    password_needs_rehash,
+)
 from app.database.connection import db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.token import Token
 from app.core.config import settings
-from app.api.deps import get_current_admin_user
+from app.api.deps import get_current_admin_user, invalidate_user
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = await db.users.find_one({"username": form_data.username})
-    if not user or not verify_password(form_data.password, user["password_hash"]):
+    if not user or not await verify_password_async(form_data.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    # Upgrade hashes made with an older cost factor while we have the plain password
+    if password_needs_rehash(user["password_hash"]):
+        new_hash = await get_password_hash_async(form_data.password)
+        await db.users.update_one({"_id": user["_id"]}, {"$set": {"password_hash": new_hash}})
+        invalidate_user(user["username"])
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user["username"], "role": user["role"]}, expires_delta=access_token_expires
@@ -35,28 +49,51 @@ async def create_user(user_in: UserCreate, current_user: User = Depends(get_curr
             detail="Username already registered",
         )
     
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await get_password_hash_async(user_in.password)
     user_dict = user_in.dict()
     user_dict["password_hash"] = hashed_password
     del user_dict["password"]
     
     new_user = await db.users.insert_one(user_dict)
+    invalidate_user(user_in.username)
     created_user = await db.users.find_one({"_id": new_user.inserted_id})
     return User(**created_user)
 
-@router.on_event("startup")
+@router.post("/users/{username}/disable", response_model=UserResponse)
+async def disable_user(username: str, current_user: User = Depends(get_current_admin_user)):
+    if username == current_user.username:
+        raise HTTPException(status_code=400, detail="You cannot disable your own account")
+    
+    user = await db.users.find_one_and_update(
+        {"username": username},
+        {"$set": {"disabled": True}},
+        return_document=ReturnDocument.AFTER
+    )
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Drop the cached principal so the next request sees the disabled flag
+    invalidate_user(username)
+    return User(**user)
+
 async def create_initial_admin():
-    # Check if admin exists, if not create one
-    admin = await db.users.find_one({"role": "admin"})
-    if not admin:
-        hashed_password = get_password_hash("admin123")
-        admin_user = {
-            "username": "admin",
-            "email": "admin@example.com",
-            "full_name": "System Admin",
-            "password_hash": hashed_password,
-            "role": "admin",
-            "disabled": False
-        }
-        await db.users.insert_one(admin_user)
+    # Run from the app lifespan in app/main.py
+    # Seed an admin only if none exists. Two processes seeding at once may both
+    # reach the upsert; the unique username index lets only one of them insert
+    if await db.users.find_one({"role": "admin"}):
+        return
+    hashed_password = await get_password_hash_async("admin123")
+    admin_user = {
+        "username": "admin",
+        "email": "admin@example.com",
+        "full_name": "System Admin",
+        "password_hash": hashed_password,
+        "disabled": False
+    }
+    try:
+        result = await db.users.update_one({"role": "admin"}, {"$setOnInsert": admin_user}, upsert=True)
+    except DuplicateKeyError:
+        print("Admin user not created: username 'admin' is already taken")
+        return
+    if result.upserted_id is not None:
         print("Admin user created: admin / admin123")
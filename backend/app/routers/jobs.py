@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.api.deps import get_current_active_user
+from app.core.jobs import get_job, open_result
+from app.schemas.job import JobResponse
+from app.schemas.user import UserResponse
+
+router = APIRouter()
+
+async def _visible_job(job_id: str, current_user):
+    # Users see their own jobs, admins see all of them
+    job = await get_job(job_id)
+    if job is None or (current_user.role != "admin" and job["created_by"] != str(current_user.id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job_status(job_id: str, current_user: UserResponse = Depends(get_current_active_user)):
+    job = await _visible_job(job_id, current_user)
+    return {
+        **job,
+        "id": str(job["_id"]),
+        "result_url": f"/api/jobs/{job_id}/result" if job["status"] == "succeeded" else None,
+    }
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str, current_user: UserResponse = Depends(get_current_active_user)):
+    job = await _visible_job(job_id, current_user)
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    if "result_file_id" not in job:
+        return job.get("result", {})
+    
+    grid_out = await open_result(job)
+
+    async def chunks():
+        while chunk := await grid_out.readchunk():
+            yield chunk
+
+    headers = {
+        'Content-Disposition': f'attachment; filename="{job["result_filename"]}"'
+    }
+    return StreamingResponse(chunks(), headers=headers, media_type=job["result_media_type"])
@@ -1,48 +1,81 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from typing import List, Optional
-from app.database.connection import db
+from app.database.connection import db, read_db
+from app.database.bulk import bulk_upsert
+from app.database.summaries import refresh_roster_summaries
+from app.database.versions import bump_versions
+from app.database.roster import roster_index
+from app.core.config import settings
+from app.core.jobs import job_handler, submit_job
+from app.core.serialization import fast_lists_enabled, STUDENT_PROJECTION
+from app.core.response_cache import CachedRoute, cached_response
 from app.api.deps import get_current_active_user, get_current_admin_user
-from app.utils.excel_handler import parse_student_excel
+from app.utils.excel_handler import parse_student_file_async, MAX_REPORTED_ERRORS
+from app.utils.pagination import keyset_cursor, fetch_page, wants_ndjson, ndjson_response
 from app.models.student import Student
 from app.schemas.user import UserResponse
+from app.schemas.student import StudentLookupRequest, StudentLookupResponse
 
-router = APIRouter()
+router = APIRouter(route_class=CachedRoute)
+
+async def import_students(content: bytes, filename: str) -> dict:
+    # Shared by the upload endpoint and the background student_import job
+    students_data, errors = await parse_student_file_async(content, filename)
+    
+    # Upsert on roll number in unordered batches so new students are added
+    # and existing ones pick up any changed details
+    counts = await bulk_upsert(
+        db.students,
+        "roll_number",
+        students_data,
+        settings.STUDENT_UPLOAD_BATCH_SIZE
+    )
+    if counts["inserted"] or counts["updated"]:
+        await refresh_roster_summaries(db)
+        # Students may have moved between classes, so every cached roster read goes stale
+        await bump_versions(db, "students")
+        roster_index.invalidate()
+    counts["rejected"] += len(errors)
+    counts["errors"] = errors[:MAX_REPORTED_ERRORS]
+    return counts
+
+@job_handler("student_import")
+async def run_student_import(job):
+    return await import_students(await job.read_input(), job.params["filename"])
 
 @router.post("/upload", status_code=201)
 async def upload_students(
     file: UploadFile = File(...),
+    background: bool = False, # Queue the import as a job and return its id right away
     current_user: UserResponse = Depends(get_current_admin_user)
 ):
-    if not file.filename.endswith(".xlsx") and not file.filename.endswith(".xls"):
-        raise HTTPException(status_code=400, detail="Invalid file format. Please upload an Excel file.")
+    if not file.filename.lower().endswith((".xlsx", ".xls", ".csv")):
+        raise HTTPException(status_code=400, detail="Invalid file format. Please upload an Excel or CSV file.")
     
     content = await file.read()
+    if background:
+        job_id = await submit_job("student_import", {"filename": file.filename}, str(current_user.id), content, file.filename)
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status_url": f"/api/jobs/{job_id}"})
+    
     try:
-        students_data = parse_student_excel(content)
+        counts = await import_students(content, file.filename)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    
-    # Bulk insert or update
-    # Ideally should handle duplicates. For now, we'll try to insert and catch errors or just insert.
-    # A better approach is to upsert based on Roll Number.
-    
-    count = 0
-    for student in students_data:
-        # Check if exists
-        existing = await db.students.find_one({"roll_number": student["roll_number"]})
-        if not existing:
-            await db.students.insert_one(student)
-            count += 1
-        else:
-            # Update mechanism could go here
-            pass
-            
-    return {"message": f"Successfully processed. {count} new students added."}
+
+    return {
+        "message": f"Successfully processed. {counts['inserted']} new students added, {counts['updated']} updated, {counts['rejected']} rejected.",
+        **counts
+    }
 
 @router.get("/", response_model=List[Student])
 async def get_students(
+    request: Request,
+    response: Response,
     branch: Optional[str] = None,
     year: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.LIST_PAGE_SIZE_MAX),
+    after: Optional[str] = None,
     current_user: UserResponse = Depends(get_current_active_user)
 ):
     query = {}
@@ -51,6 +84,26 @@ async def get_students(
     if year:
         query["year"] = year
         
-    students_cursor = db.students.find(query)
-    students = await students_cursor.to_list(length=1000)
-    return students
+    # Paged like GET /api/attendance/: LIST_PAGE_SIZE_DEFAULT rows without `limit`,
+    # the whole result only as application/x-ndjson
+    fast = fast_lists_enabled()
+    projection = STUDENT_PROJECTION if fast else None
+    if wants_ndjson(request):
+        return ndjson_response(keyset_cursor(read_db.students, query, limit, after, projection), settings.EXPORT_BATCH_SIZE)
+    
+    cached = await cached_response(request, [("students", branch, year, None)])
+    if cached:
+        return cached
+    limit = limit or settings.LIST_PAGE_SIZE_DEFAULT
+    students_cursor = keyset_cursor(read_db.students, query, limit, after, projection)
+    return await fetch_page(students_cursor, response, limit, {"contact": None} if fast else None)
+
+@router.post("/lookup", response_model=StudentLookupResponse)
+async def lookup_students(
+    lookup_in: StudentLookupRequest,
+    current_user: UserResponse = Depends(get_current_active_user)
+):
+    # Resolved from the in-memory roster index, no query per roll number
+    await roster_index.ensure_fresh(db)
+    found, missing = roster_index.lookup(lookup_in.roll_numbers)
+    return {"students": list(found.values()), "missing": missing}
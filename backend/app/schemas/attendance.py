@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 class AttendanceMark(BaseModel):
@@ -17,4 +17,41 @@ class AttendanceRequest(BaseModel):
 class AttendanceResponse(BaseModel):
     message: str
     date: datetime
-    marked_count: int
+    marked_count: int # Marks actually written (new or changed)
+    matched_count: int = 0
+    modified_count: int = 0
+    upserted_count: int = 0
+    skipped_count: int = 0 # Submitted marks that were already stored unchanged
+
+class StudentAttendanceSummary(BaseModel):
+    roll_number: str
+    name: Optional[str] = None
+    branch: str
+    year: int
+    attended: int
+    total: int
+    percentage: float
+
+class TrendPoint(BaseModel):
+    period: datetime # First day of the day/week/month bucket
+    present: int
+    absent: int
+    other: int
+    total: int
+    rate: Optional[float] = None # Present as a percentage of marks
+    moving_average: Optional[float] = None # Rate over the trailing window of periods
+
+class TrendSeries(BaseModel):
+    branch: str
+    year: int
+    points: List[TrendPoint]
+
+class TrendsResponse(BaseModel):
+    granularity: str
+    start: datetime
+    end: datetime
+    window: int
+    series: List[TrendSeries]
+    threshold: float
+    week_start: datetime # Week (Monday to Sunday) containing `end`
+    below_threshold: List[StudentAttendanceSummary]
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class JobProgress(BaseModel):
+    done: int = 0
+    total: Optional[int] = None
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str # "queued", "running", "succeeded" or "failed"
+    progress: JobProgress
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result_url: Optional[str] = None
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+from typing import List
+from app.core.config import settings
+
+class StudentLookupRequest(BaseModel):
+    roll_numbers: List[str] = Field(..., max_length=settings.LIST_PAGE_SIZE_MAX)
+
+class StudentInfo(BaseModel):
+    roll_number: str
+    name: str
+    branch: str
+    year: int
+
+class StudentLookupResponse(BaseModel):
+    students: List[StudentInfo] # Known roll numbers, in request order
+    missing: List[str]          # Roll numbers not in the roster
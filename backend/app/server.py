@@ -0,0 +1,39 @@
+import os
+import sys
+import uvicorn
+from app.core.config import settings
+
+# Production entry point: uvicorn's process manager runs WEB_CONCURRENCY
+# copies of app.main:app, each importing the app and opening its own Motor
+# client in the lifespan. Signals to the manager process:
+#   SIGHUP          replace the workers one by one (graceful reload, e.g. after a deploy)
+#   SIGTTIN/SIGTTOU add / remove one worker
+#   SIGINT/SIGTERM  stop, letting in-flight requests finish within GRACEFUL_SHUTDOWN_SECONDS
+
+
+def worker_count() -> int:
+    return settings.WEB_CONCURRENCY or os.cpu_count() or 1
+
+
+def main() -> int:
+    workers = worker_count()
+    if workers > 1 and settings.LIVE_FEED_SOURCE == "local":
+        print(
+            f"Warning: {workers} workers with LIVE_FEED_SOURCE=local, live dashboards only see marks "
+            "taken by their own worker. Set LIVE_FEED_SOURCE=change_stream (replica set required)."
+        )
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    # Run from backend/: python -m app.server
+    sys.exit(main())
@@ -0,0 +1,32 @@
+from datetime import datetime, time, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+from app.core.config import settings
+
+
+def day_bucket(value: datetime) -> datetime:
+    # Canonical storage form of a class day: midnight of the calendar day in
+    # ATTENDANCE_TIMEZONE, stored as a naive datetime. Naive inputs are taken
+    # to already be in that timezone. Exactly UTC midnight is a calendar day as
+    # sent by the frontend (new Date('YYYY-MM-DD').toISOString()) and keeps its
+    # UTC date, otherwise zones west of UTC would move it to the previous day.
+    if value.tzinfo is not None:
+        if value.utcoffset() == timedelta(0) and value.time() == time(0):
+            return datetime(value.year, value.month, value.day)
+        value = value.astimezone(ZoneInfo(settings.ATTENDANCE_TIMEZONE))
+    return datetime(value.year, value.month, value.day)
+
+
+def date_condition(date: Optional[datetime] = None, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None):
+    # Mongo condition on the `date` field for an exact day or an inclusive day range,
+    # None when no date filter was given
+    if date:
+        return day_bucket(date)
+    if date_from or date_to:
+        condition = {}
+        if date_from:
+            condition["$gte"] = day_bucket(date_from)
+        if date_to:
+            condition["$lte"] = day_bucket(date_to)
+        return condition
+    return None
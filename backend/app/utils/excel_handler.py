@@ -1,36 +1,251 @@
-import pandas as pd
+import re
+import asyncio
+import importlib
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
+from datetime import datetime
+from typing import TYPE_CHECKING
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas (and the spreadsheet readers behind it) is imported on first parse, not
+# with the app: only uploads need it and it dominates worker start-up time.
+# python-calamine is an optional Rust xlsx reader, much faster than openpyxl.
+XLSX_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+PARSER_MODULES = ["pandas", "python_calamine" if XLSX_ENGINE == "calamine" else "openpyxl"]
+
+REQUIRED_COLUMNS = ["S.NO", "ROLL NO", "STUDENT NAME", "BRANCH", "YEAR"]
+# Attendance registers: a ROLL NO column plus one column per day, P/A in the cells
+REGISTER_MARKS = {"P": "Present", "PRESENT": "Present", "A": "Absent", "ABSENT": "Absent"}
+# Day headers: ISO (2024-01-31, also how Excel date cells come back) or day-first (31-01-2024)
+ISO_DAY = re.compile(r"^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?: 00:00:00)?$")
+DAY_FIRST = re.compile(r"^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})$")
+MAX_REPORTED_ERRORS = 100 # Per-row errors returned to the client, the count is always complete
+
+_parse_pool = None
+
+
+def read_sheet(file_content: bytes, filename: str) -> "pd.DataFrame":
+    # Every cell comes back as text (or NaN) so cleaning can be done column-wise
+    import pandas as pd
+
+    name = filename.lower()
+    if name.endswith(".csv"):
+        df = pd.read_csv(BytesIO(file_content), dtype=str, skipinitialspace=True)
+    elif name.endswith(".xls"):
+        df = pd.read_excel(BytesIO(file_content), dtype=str)
+    else:
+        df = pd.read_excel(BytesIO(file_content), dtype=str, engine=XLSX_ENGINE)
+
+    # Normalize columns: strip whitespace and convert to upper case for comparison
+    df.columns = [str(col).strip().upper() for col in df.columns]
+    return df
+
+
+def _text(series: "pd.Series") -> "pd.Series":
+    return series.fillna("").astype(str).str.strip()
+
+
+def _whole_number(series: "pd.Series") -> "pd.Series":
+    import pandas as pd
+
+    numbers = pd.to_numeric(series, errors="coerce")
+    return numbers.where(numbers % 1 == 0)
+
+
+def parse_student_file(file_content: bytes, filename: str = "students.xlsx"):
+    # Returns (students, errors). Rows that fail validation are left out of
+    # `students` and described in `errors` instead of failing the whole file.
+    import pandas as pd
 
-def parse_student_excel(file_content: bytes) -> list:
     try:
-        df = pd.read_excel(BytesIO(file_content))
-        
-        # Normalize columns: strip whitespace and convert to upper case for comparison
-        df.columns = [str(col).strip().upper() for col in df.columns]
-        
-        # Ensure columns exist
-        required_columns = ["S.NO", "ROLL NO", "STUDENT NAME", "BRANCH", "YEAR"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            raise ValueError(f"Missing columns: {missing_columns}. Found: {list(df.columns)}")
-        
-        # Convert to list of dicts
-        students = df.to_dict(orient="records")
-        
-        # Clean data (ensure types)
-        cleaned_students = []
-        for student in students:
-            contact = str(student.get("CONTACT", "")) if not pd.isna(student.get("CONTACT")) else None
-            cleaned_students.append({
-                "s_no": int(student["S.NO"]),
-                "roll_number": str(student["ROLL NO"]),
-                "name": str(student["STUDENT NAME"]),
-                "branch": str(student["BRANCH"]),
-                "year": int(student["YEAR"]),
-                "contact": contact
-            })
-            
-        return cleaned_students
+        df = read_sheet(file_content, filename)
     except Exception as e:
         raise ValueError(f"Error parsing Excel file: {str(e)}")
+
+    # Ensure columns exist
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Error parsing Excel file: Missing columns: {missing_columns}. Found: {list(df.columns)}")
+
+    # Drop rows that are entirely blank (trailing formatting in spreadsheets)
+    df = df.dropna(how="all")
+
+    roll_number = _text(df["ROLL NO"])
+    name = _text(df["STUDENT NAME"])
+    branch = _text(df["BRANCH"])
+    s_no = _whole_number(df["S.NO"])
+    year = _whole_number(df["YEAR"])
+    contact = _text(df["CONTACT"]) if "CONTACT" in df.columns else pd.Series("", index=df.index)
+
+    checks = {
+        "missing ROLL NO": roll_number == "",
+        "duplicate ROLL NO": (roll_number != "") & roll_number.duplicated(keep="first"),
+        "missing STUDENT NAME": name == "",
+        "missing BRANCH": branch == "",
+        "bad S.NO": s_no.isna(),
+        "bad YEAR": year.isna() | (year < 1),
+    }
+    invalid = pd.Series(False, index=df.index)
+    for mask in checks.values():
+        invalid |= mask
+
+    errors = []
+    for position in invalid.to_numpy().nonzero()[0]:
+        index = df.index[position]
+        errors.append({
+            "row": int(index) + 2, # Spreadsheet row number, after the header
+            "roll_number": roll_number[index] or None,
+            "errors": [message for message, mask in checks.items() if mask[index]],
+        })
+
+    valid = ~invalid
+    students = pd.DataFrame({
+        "s_no": s_no[valid].astype("int64"),
+        "roll_number": roll_number[valid],
+        "name": name[valid],
+        "branch": branch[valid],
+        "year": year[valid].astype("int64"),
+        "contact": contact[valid].astype(object).where(contact[valid] != "", None),
+    })
+    return students.to_dict(orient="records"), errors
+
+
+def _header_day(header: str):
+    match = ISO_DAY.match(header)
+    if match:
+        year, month, day = match.groups()
+    else:
+        match = DAY_FIRST.match(header)
+        if not match:
+            return None
+        day, month, year = match.groups()
+    try:
+        return datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def parse_register_file(file_content: bytes, filename: str = "register.xlsx"):
+    # Returns (marks, errors): marks are (day, roll_number, status, row, column) for
+    # every P/A cell; blank cells are not marks. Bad rows and cells are reported in
+    # `errors` and left out, a sheet without ROLL NO or day columns fails as a whole.
+    import pandas as pd
+
+    try:
+        df = read_sheet(file_content, filename)
+    except Exception as e:
+        raise ValueError(f"Error parsing register file: {str(e)}")
+
+    if "ROLL NO" not in df.columns:
+        raise ValueError(f"Error parsing register file: Missing column ROLL NO. Found: {list(df.columns)}")
+    days = {}
+    for column in df.columns:
+        day = _header_day(column)
+        if day is not None:
+            if day in days.values():
+                raise ValueError(f"Error parsing register file: {day.date()} appears in more than one column")
+            days[column] = day
+    if not days:
+        raise ValueError("Error parsing register file: No date columns found (use e.g. 2024-01-31 or 31-01-2024)")
+
+    df = df.dropna(how="all")
+    roll_number = _text(df["ROLL NO"])
+    row_checks = {
+        "missing ROLL NO": roll_number == "",
+        "duplicate ROLL NO": (roll_number != "") & roll_number.duplicated(keep="first"),
+    }
+    bad_row = pd.Series(False, index=df.index)
+    for mask in row_checks.values():
+        bad_row |= mask
+
+    errors = []
+    for position in bad_row.to_numpy().nonzero()[0]:
+        index = df.index[position]
+        errors.append({
+            "row": int(index) + 2,
+            "roll_number": roll_number[index] or None,
+            "errors": [message for message, mask in row_checks.items() if mask[index]],
+        })
+
+    # One row per (student, day) cell
+    cells = df.loc[~bad_row, list(days)].assign(**{"ROLL NO": roll_number[~bad_row]})
+    cells = cells.melt(id_vars="ROLL NO", var_name="column", value_name="cell", ignore_index=False)
+    value = _text(cells["cell"])
+    status = value.str.upper().map(REGISTER_MARKS)
+    bad_cell = (value != "") & status.isna()
+    for index, column, roll, cell in zip(
+        cells.index[bad_cell], cells["column"][bad_cell], cells["ROLL NO"][bad_cell], value[bad_cell]
+    ):
+        errors.append({
+            "row": int(index) + 2,
+            "column": column,
+            "roll_number": roll,
+            "errors": [f"bad mark {cell!r}, expected P or A"],
+        })
+    errors.sort(key=lambda error: error["row"])
+
+    # Plain Python values only: marks are pickled back from the parse pool, which
+    # must not pull pandas into the web process
+    marked = cells[status.notna()]
+    marks = [
+        (days[column], roll, mark, row, column)
+        for column, roll, mark, row in zip(
+            marked["column"].tolist(),
+            marked["ROLL NO"].tolist(),
+            status[status.notna()].tolist(),
+            (marked.index + 2).tolist(),
+        )
+    ]
+    return marks, errors
+
+
+def _pool():
+    # spawn, not fork: the parent holds Motor/pymongo threads that must not be forked
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=settings.PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_pool
+
+
+async def _parse_off_loop(parse, file_content: bytes, filename: str):
+    # Keeps pandas off the event loop; PARSE_WORKERS=0 uses a thread instead of processes
+    loop = asyncio.get_running_loop()
+    executor = _pool() if settings.PARSE_WORKERS > 0 else None
+    return await loop.run_in_executor(executor, parse, file_content, filename)
+
+
+async def parse_student_file_async(file_content: bytes, filename: str):
+    return await _parse_off_loop(parse_student_file, file_content, filename)
+
+
+async def parse_register_file_async(file_content: bytes, filename: str):
+    return await _parse_off_loop(parse_register_file, file_content, filename)
+
+
+def load_parser_modules():
+    for module in PARSER_MODULES:
+        importlib.import_module(module)
+
+
+def preload_parser():
+    # PRELOAD_HEAVY_IMPORTS: pay the import cost at start-up instead of on the
+    # first upload, in this process and in each parse worker
+    load_parser_modules()
+    if settings.PARSE_WORKERS > 0:
+        for _ in range(settings.PARSE_WORKERS):
+            _pool().submit(load_parser_modules)
+
+
+def shutdown_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
@@ -0,0 +1,92 @@
+import csv
+import json
+from io import StringIO
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from starlette.concurrency import run_in_threadpool
+
+# Column order used by every export format
+EXPORT_COLUMNS = ["date", "student_roll_number", "branch", "year", "status", "marked_by", "created_at", "updated_at"]
+
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def cursor_batches(cursor, batch_size: int):
+    # Pull documents off a Motor cursor batch by batch instead of one big to_list
+    while True:
+        batch = await cursor.to_list(length=batch_size)
+        if not batch:
+            return
+        yield batch
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+async def _all_batches(first_batch, batches):
+    yield first_batch
+    async for batch in batches:
+        yield batch
+
+
+async def stream_csv(first_batch, batches):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for batch in _all_batches(first_batch, batches):
+        for doc in batch:
+            writer.writerow([_plain(doc.get(col)) for col in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+async def stream_ndjson(first_batch, batches):
+    async for batch in _all_batches(first_batch, batches):
+        yield "".join(
+            json.dumps({col: _plain(doc.get(col)) for col in EXPORT_COLUMNS}) + "\n"
+            for doc in batch
+        )
+
+
+async def stream_xlsx(first_batch, batches):
+    # Write-only workbooks flush rows to a temp file as they are appended,
+    # so memory stays bounded however many rows the cursor returns
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Attendance")
+    sheet.append(EXPORT_COLUMNS)
+    async for batch in _all_batches(first_batch, batches):
+        for doc in batch:
+            sheet.append([_xlsx_cell(doc.get(col)) for col in EXPORT_COLUMNS])
+
+    with SpooledTemporaryFile(max_size=CHUNK_SIZE * 16) as output:
+        await run_in_threadpool(workbook.save, output)
+        output.seek(0)
+        while chunk := output.read(CHUNK_SIZE):
+            yield chunk
+
+
+def _xlsx_cell(value):
+    if isinstance(value, datetime) or value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+WRITERS = {
+    "xlsx": stream_xlsx,
+    "csv": stream_csv,
+    "ndjson": stream_ndjson,
+}
@@ -0,0 +1,50 @@
+from bson import ObjectId
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from app.utils.export_writer import cursor_batches
+from app.core.serialization import dumps, trusted_response
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def keyset_cursor(collection, query: dict, limit=None, after=None, projection=None):
+    # Keyset pagination on _id: `after` is the last _id of the previous page
+    query = dict(query)
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query["_id"] = {"$gt": ObjectId(after)}
+
+    cursor = collection.find(query, projection)
+    if limit or after:
+        cursor = cursor.sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+
+async def fetch_page(cursor, response: Response, limit=None, trusted_defaults=None):
+    # trusted_defaults is not None when the caller opted into the fast serialization path
+    documents = await cursor.to_list(length=limit)
+    headers = {}
+    if limit and len(documents) == limit:
+        headers[NEXT_CURSOR_HEADER] = str(documents[-1]["_id"])
+    if trusted_defaults is not None:
+        return trusted_response(documents, trusted_defaults, headers=headers)
+    response.headers.update(headers)
+    return documents
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _ndjson_lines(cursor, batch_size: int):
+    async for batch in cursor_batches(cursor, batch_size):
+        yield b"".join(dumps(doc) + b"\n" for doc in batch)
+
+
+def ndjson_response(cursor, batch_size: int) -> StreamingResponse:
+    # Writes documents as they come off the cursor, one JSON object per line
+    return StreamingResponse(_ndjson_lines(cursor, batch_size), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,174 @@
+# Endpoint benchmark suite.
+#
+# Seeds N students across branches/years and D days of attendance, then drives
+# the main endpoints through the ASGI app and reports p50/p95/p99 latency,
+# throughput and peak RSS as JSON.
+#
+#   --backend fake   in-process mongomock-motor database (default, no server needed)
+#   --backend mongo  --mongo-url/--db, e.g. a local mongod; the database is dropped first,
+#                    so its name must contain "bench" unless --drop is given too
+#
+# Run from backend/:
+#   python -m benchmarks.bench_endpoints --students 2000 --days 30 --output after.json
+#   python -m benchmarks.bench_endpoints --backend mongo --mongo-url mongodb://localhost:27017 --db attendance_bench
+#   python -m benchmarks.bench_endpoints --output after.json --compare before.json
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import timedelta
+from benchmarks.common import BENCH_DATABASE_MARKER, add_backend_arguments, connect_backend
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Endpoint benchmark suite")
+    add_backend_arguments(parser)
+    parser.add_argument("--drop", action="store_true", help="Allow dropping a --db whose name does not contain 'bench'")
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", help="Comma separated subset of scenarios to run")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed p95 slowdown before failing, 0.10 = 10%%")
+    return parser.parse_args(argv)
+
+
+async def run_scenario(client, make_request, requests, concurrency):
+    from benchmarks.common import summarize, timed
+
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+    latencies = []
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            method, url, kwargs = make_request(i)
+            latencies.append(await timed(client, method, url, **kwargs))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {**summarize(latencies), "throughput_per_s": requests / elapsed}
+
+
+def build_scenarios(token, dataset):
+    from benchmarks.dataset import BENCH_ADMIN, BENCH_PASSWORD, FIRST_DAY, classes, roll_number
+
+    auth = {"Authorization": f"Bearer {token}"}
+    class_list = classes()
+    per_class = dataset["per_class"]
+
+    def class_for(i):
+        return class_list[i % len(class_list)]
+
+    def day_for(i):
+        return (FIRST_DAY + timedelta(days=i % dataset["days"])).isoformat()
+
+    def mark(i):
+        branch, year = class_for(i)
+        # Flip one student per request so every call has real work to write
+        data = [
+            {"student_roll_number": roll_number(branch, year, index), "status": "Absent" if index == i % per_class else "Present"}
+            for index in range(per_class)
+        ]
+        return "POST", "/api/attendance/mark", {
+            "json": {"date": day_for(i), "branch": branch, "year": year, "attendance_data": data},
+            "headers": auth,
+        }
+
+    return {
+        "root": lambda i: ("GET", "/", {}),
+        "login": lambda i: ("POST", "/api/auth/login", {"data": {"username": BENCH_ADMIN, "password": BENCH_PASSWORD}}),
+        "students": lambda i: ("GET", "/api/students/", {
+            "params": dict(zip(("branch", "year"), class_for(i))), "headers": auth}),
+        "mark": mark,
+        "attendance": lambda i: ("GET", "/api/attendance/", {
+            "params": {"date": day_for(i), **dict(zip(("branch", "year"), class_for(i)))}, "headers": auth}),
+        "export": lambda i: ("GET", "/api/attendance/export", {
+            "params": {"format": "csv", **dict(zip(("branch", "year"), class_for(i)))}, "headers": auth}),
+        "analytics": lambda i: ("GET", "/api/attendance/analytics", {
+            "params": {"date": day_for(i)}, "headers": auth}),
+    }
+
+
+def compare(report, baseline, tolerance):
+    # p95 ratio per scenario; anything slower than baseline * (1 + tolerance) is a regression
+    result = {"tolerance": tolerance, "scenarios": {}, "regressions": []}
+    for name, current in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not before.get("p95_ms"):
+            continue
+        ratio = current["p95_ms"] / before["p95_ms"]
+        result["scenarios"][name] = {
+            "baseline_p95_ms": before["p95_ms"],
+            "p95_ms": current["p95_ms"],
+            "p95_ratio": ratio,
+            "throughput_ratio": current["throughput_per_s"] / before["throughput_per_s"],
+        }
+        if ratio > 1 + tolerance:
+            result["regressions"].append(name)
+    return result
+
+
+async def main(args) -> int:
+    database = connect_backend(args)
+    if args.backend == "mongo" and BENCH_DATABASE_MARKER not in database.name and not args.drop:
+        print(f"Refusing to drop database {database.name!r}: use a name containing {BENCH_DATABASE_MARKER!r} or pass --drop")
+        return 2
+
+    import httpx
+    from app.main import app
+    from app.database.connection import db
+    from benchmarks.common import peak_rss_mb
+    from benchmarks.dataset import seed, BENCH_ADMIN, BENCH_PASSWORD
+
+    if args.backend == "mongo":
+        await database.client.drop_database(database.name)
+
+    async with app.router.lifespan_context(app):
+        seed_start = time.perf_counter()
+        dataset = await seed(db, args.students, args.days)
+        dataset["seed_s"] = time.perf_counter() - seed_start
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            response = await client.post("/api/auth/login", data={"username": BENCH_ADMIN, "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            scenarios = build_scenarios(response.json()["access_token"], dataset)
+            selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+
+            results = {}
+            for name in selected:
+                results[name] = await run_scenario(client, scenarios[name], args.requests, args.concurrency)
+                results[name]["peak_rss_mb"] = peak_rss_mb()
+
+    report = {
+        "backend": args.backend,
+        "dataset": dataset,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "scenarios": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    failed = False
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+        failed = bool(report["comparison"]["regressions"])
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args(sys.argv[1:]))))
@@ -0,0 +1,76 @@
+# Login throughput benchmark.
+#
+# Fires bursts of concurrent /api/auth/login requests through the ASGI app and,
+# at the same time, probes GET / to show that other endpoints keep their
+# latency while bcrypt work is in flight.
+#
+#   --backend fake   in-process mongomock-motor database (default, no server needed)
+#   --backend mongo  --mongo-url/--db (never MONGODB_URL); only the benchmark user is
+#                    written and it is removed afterwards
+#
+# Run from backend/: python -m benchmarks.bench_login --logins 50 --probes 200
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from benchmarks.common import add_backend_arguments, connect_backend, summarize, timed
+from app.main import app
+from app.database.connection import db
+from app.core.security import get_password_hash_async
+
+BENCH_USER = "bench_login_user"
+BENCH_PASSWORD = "bench-password"
+
+
+async def probe(client, count):
+    return [await timed(client, "GET", "/") for _ in range(count)]
+
+
+async def login_burst(client, count):
+    data = {"username": BENCH_USER, "password": BENCH_PASSWORD}
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(client, "POST", "/api/auth/login", data=data) for _ in range(count)))
+    elapsed = time.perf_counter() - start
+    return list(latencies), elapsed
+
+
+async def main(args):
+    connect_backend(args)
+    await db.users.update_one(
+        {"username": BENCH_USER},
+        {"$set": {
+            "username": BENCH_USER,
+            "email": "bench@example.com",
+            "full_name": "Login Benchmark",
+            "password_hash": await get_password_hash_async(BENCH_PASSWORD),
+            "role": "teacher",
+            "disabled": False,
+        }},
+        upsert=True
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle_probe = await probe(client, args.probes)
+
+        busy_probe_task = asyncio.create_task(probe(client, args.probes))
+        login_latencies, elapsed = await login_burst(client, args.logins)
+        busy_probe = await busy_probe_task
+
+    await db.users.delete_one({"username": BENCH_USER})
+
+    report = {
+        "logins": {**summarize(login_latencies), "throughput_per_s": args.logins / elapsed},
+        "root_idle": summarize(idle_probe),
+        "root_during_logins": summarize(busy_probe),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    add_backend_arguments(parser)
+    parser.add_argument("--logins", type=int, default=50, help="Concurrent logins per burst")
+    parser.add_argument("--probes", type=int, default=200, help="GET / requests per probe run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,77 @@
+# List response serialization benchmark.
+#
+# Compares the default path for GET /api/attendance/ (response_model validation
+# of List[Attendance] through the PyObjectId BeforeValidator, jsonable encoding,
+# stdlib JSON) against the FAST_LIST_RESPONSES path (projected documents
+# rendered by MongoJSONResponse). No database needed.
+#
+# Run from backend/: python -m benchmarks.bench_serialization --rows 5000
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from app.models.attendance import Attendance
+from app.core.serialization import trusted_response, ATTENDANCE_PROJECTION
+
+
+def make_documents(rows):
+    day = datetime(2026, 1, 5)
+    marked_by = str(ObjectId())
+    return [
+        {
+            "_id": ObjectId(),
+            "date": day + timedelta(days=i // 500),
+            "branch": "CSE",
+            "year": 3,
+            "student_roll_number": f"21A91A{i:04d}",
+            "status": "Present" if i % 5 else "Absent",
+            "marked_by": marked_by,
+            "created_at": day,
+            "updated_at": day,
+        }
+        for i in range(rows)
+    ]
+
+
+def default_path(documents):
+    adapter = TypeAdapter(List[Attendance])
+    models = adapter.validate_python(documents)
+    content = jsonable_encoder(adapter.dump_python(models, by_alias=True))
+    return JSONResponse(content).body
+
+
+def fast_path(documents):
+    projected = [{key: doc[key] for key in ATTENDANCE_PROJECTION if key in doc} for doc in documents]
+    return trusted_response(projected).body
+
+
+def measure(function, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        documents = make_documents(rows)
+        start = time.perf_counter()
+        body = function(documents)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"best_ms": min(timings), "mean_ms": sum(timings) / len(timings), "bytes": len(body)}
+
+
+def main(args):
+    report = {
+        "rows": args.rows,
+        "default": measure(default_path, args.rows, args.repeat),
+        "fast": measure(fast_path, args.rows, args.repeat),
+    }
+    report["speedup"] = report["default"]["best_ms"] / report["fast"]["best_ms"]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List response serialization benchmark")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    main(parser.parse_args())
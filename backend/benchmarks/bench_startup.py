@@ -0,0 +1,152 @@
+# Cold-start report.
+#
+# Starts fresh interpreters that import app.main under `-X importtime`, run the
+# app lifespan and wait for the first healthy `GET /`, then reports the import
+# breakdown by top-level package, the median time to first healthy `/` and any
+# lazily-loaded module (pandas, openpyxl, ...) that was imported at start-up.
+#
+#   --backend fake   in-process mongomock-motor database (default, no server needed)
+#   --backend mongo  --mongo-url/--db (never MONGODB_URL); the lifespan creates
+#                    indexes and seeds the admin user there
+#
+# Exits 1 when a budget is exceeded or a lazy module was loaded, so CI can gate on it.
+# Run from backend/:
+#   python -m benchmarks.bench_startup --runs 5 --import-budget-ms 1500 --budget-ms 3000
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from benchmarks.common import add_backend_arguments, connect_backend
+
+# Heavy modules that only uploads and exports load, on first use
+LAZY_MODULES = ["pandas", "openpyxl", "python_calamine"]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Cold-start report")
+    add_backend_arguments(parser)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes to start, medians are reported")
+    parser.add_argument("--top", type=int, default=15, help="Packages listed in the import breakdown")
+    parser.add_argument("--budget-ms", type=float, help="Fail when time to first healthy / exceeds this")
+    parser.add_argument("--import-budget-ms", type=float, help="Fail when importing app.main exceeds this")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+async def child(args):
+    # Runs inside the measured process
+    start = time.perf_counter()
+    import app.main
+    import_ms = (time.perf_counter() - start) * 1000
+    lazy_loaded = [name for name in LAZY_MODULES if name in sys.modules]
+
+    connect_backend(args)
+
+    import httpx
+    async with app.main.app.router.lifespan_context(app.main.app):
+        transport = httpx.ASGITransport(app=app.main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get("/")
+            response.raise_for_status()
+            ready_ms = (time.perf_counter() - start) * 1000
+            # Flushed before the lifespan shuts down, the parent timestamps this line
+            print(json.dumps({"import_ms": import_ms, "ready_ms": ready_ms, "lazy_loaded": lazy_loaded}), flush=True)
+
+
+def import_breakdown(stderr: str) -> dict:
+    # -X importtime lines: "import time: <self us> | <cumulative us> | <indented module>"
+    self_us = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, module = line[len("import time:"):].split("|")
+        self_us[module.strip().split(".")[0]] += int(self_time)
+    return self_us
+
+
+def backend_arguments(args) -> list:
+    if args.backend == "fake":
+        return ["--backend", "fake"]
+    return ["--backend", "mongo", "--mongo-url", args.mongo_url, "--db", args.db]
+
+
+def run_once(args) -> dict:
+    # importtime output goes to a file so a full stderr pipe can't stall the child
+    with tempfile.TemporaryFile(mode="w+") as importtime:
+        launched = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-X", "importtime", "-m", "benchmarks.bench_startup", "--child", *backend_arguments(args)],
+            stdout=subprocess.PIPE,
+            stderr=importtime,
+            text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        result = None
+        for line in process.stdout:
+            if line.startswith("{"):
+                result = json.loads(line)
+                result["first_healthy_ms"] = (time.perf_counter() - launched) * 1000
+        returncode = process.wait()
+        importtime.seek(0)
+        stderr = importtime.read()
+    if returncode != 0 or result is None:
+        raise RuntimeError(f"start-up run failed:\n{stderr[-2000:]}")
+    result["packages_us"] = import_breakdown(stderr)
+    return result
+
+
+def main(args) -> int:
+    if args.child:
+        asyncio.run(child(args))
+        return 0
+
+    if args.backend == "mongo" and not (args.mongo_url and args.db):
+        print("--backend mongo needs --mongo-url and --db")
+        return 2
+    runs = [run_once(args) for _ in range(args.runs)]
+    packages = defaultdict(list)
+    for run in runs:
+        for package, us in run["packages_us"].items():
+            packages[package].append(us / 1000)
+    breakdown = sorted(
+        ((package, statistics.median(times)) for package, times in packages.items()),
+        key=lambda item: item[1],
+        reverse=True
+    )
+
+    report = {
+        "backend": args.backend,
+        "runs": args.runs,
+        # Interpreter launch to the first 200 from GET / (includes the app lifespan)
+        "first_healthy_ms": statistics.median(run["first_healthy_ms"] for run in runs),
+        "import_app_ms": statistics.median(run["import_ms"] for run in runs),
+        "import_breakdown_ms": {package: round(ms, 1) for package, ms in breakdown[:args.top]},
+        "lazy_modules_loaded": sorted({name for run in runs for name in run["lazy_loaded"]}),
+    }
+
+    failures = []
+    if args.budget_ms is not None and report["first_healthy_ms"] > args.budget_ms:
+        failures.append(f"first healthy / after {report['first_healthy_ms']:.0f} ms, budget {args.budget_ms:.0f} ms")
+    if args.import_budget_ms is not None and report["import_app_ms"] > args.import_budget_ms:
+        failures.append(f"app import took {report['import_app_ms']:.0f} ms, budget {args.import_budget_ms:.0f} ms")
+    if report["lazy_modules_loaded"]:
+        failures.append(f"lazy modules imported at start-up: {', '.join(report['lazy_modules_loaded'])}")
+    report["failures"] = failures
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,55 @@
+import resource
+import statistics
+import time
+
+# --backend mongo only ever uses the server and database given on the command line,
+# never MONGODB_URL (the committed .env points at the production cluster)
+BENCH_DATABASE_MARKER = "bench"
+
+
+def add_backend_arguments(parser):
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--mongo-url", help="Server for --backend mongo, e.g. mongodb://localhost:27017")
+    parser.add_argument("--db", help="Database for --backend mongo")
+
+
+def connect_backend(args):
+    # Call before the app lifespan starts; returns the database the app will use
+    if args.backend == "fake":
+        from benchmarks.fake_mongo import install_fake_database
+        return install_fake_database()
+    if not args.mongo_url or not args.db:
+        raise SystemExit("--backend mongo needs --mongo-url and --db")
+    from app.database import connection
+    return connection.connect(name=args.db, url=args.mongo_url)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies):
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": statistics.fmean(latencies) if latencies else None,
+    }
+
+
+async def timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    response.raise_for_status()
+    await response.aread()
+    return (time.perf_counter() - start) * 1000
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from app.core.security import get_password_hash_async
+from app.database.attendance_store import get_attendance_store
+from app.database.summaries import rebuild_attendance_summaries, refresh_roster_summaries
+
+BRANCHES = ["CSE", "ECE", "EEE", "MECH", "CIVIL"]
+YEARS = [1, 2, 3, 4]
+FIRST_DAY = datetime(2026, 1, 5)
+BENCH_ADMIN = "bench_admin"
+BENCH_PASSWORD = "bench-password"
+
+
+def classes():
+    return [(branch, year) for branch in BRANCHES for year in YEARS]
+
+
+def roll_number(branch, year, index):
+    return f"{year}{branch}{index:05d}"
+
+
+async def seed(database, students: int, days: int):
+    # N students spread evenly over every (branch, year), D days of marks for all of them
+    await database.users.update_one(
+        {"username": BENCH_ADMIN},
+        {"$set": {
+            "username": BENCH_ADMIN,
+            "email": "bench@example.com",
+            "full_name": "Benchmark Admin",
+            "password_hash": await get_password_hash_async(BENCH_PASSWORD),
+            "role": "admin",
+            "disabled": False,
+        }},
+        upsert=True
+    )
+
+    per_class = max(1, students // len(classes()))
+    roster = []
+    for branch, year in classes():
+        for index in range(per_class):
+            roster.append({
+                "s_no": len(roster) + 1,
+                "roll_number": roll_number(branch, year, index),
+                "name": f"Student {len(roster) + 1}",
+                "branch": branch,
+                "year": year,
+                "contact": None,
+            })
+    await database.students.insert_many(roster)
+
+    store = get_attendance_store()
+    timestamp = datetime.utcnow()
+    for day in range(days):
+        date = FIRST_DAY + timedelta(days=day)
+        for branch, year in classes():
+            records = [
+                (roll_number(branch, year, index), branch, year, "Absent" if (index + day) % 7 == 0 else "Present")
+                for index in range(per_class)
+            ]
+            await store.write_marks(database, date, records, {}, "bench", timestamp)
+
+    await rebuild_attendance_summaries(database)
+    await refresh_roster_summaries(database)
+    return {"students": len(roster), "days": days, "per_class": per_class}
@@ -0,0 +1,21 @@
+# In-process Motor-compatible stand-in for benchmarks without a local mongod.
+# Must be installed before the app lifespan starts (importing app modules is fine:
+# nothing connects until the lifespan or the first query).
+import app.database.connection as connection
+
+
+def install_fake_database(name: str = "attendance_bench"):
+    from mongomock_motor import AsyncMongoMockClient
+    import mongomock.collection
+
+    # pymongo >= 4.9 passes sort= to bulk update/replace builders, which mongomock does not accept yet
+    for method in ("add_update", "add_replace"):
+        add = getattr(mongomock.collection.BulkOperationBuilder, method)
+        if getattr(add, "_accepts_sort", False):
+            continue
+        def add_without_sort(self, *args, sort=None, _add=add, **kwargs):
+            return _add(self, *args, **kwargs)
+        add_without_sort._accepts_sort = True
+        setattr(mongomock.collection.BulkOperationBuilder, method, add_without_sort)
+
+    return connection.connect(AsyncMongoMockClient(), name)
@@ -30,4 +30,17 @@ api.interceptors.response.use(
     }
 );
 
+// Listing endpoints return one page at a time and send the cursor for the
+// next page in X-Next-Cursor; follow it until the last page
+export const getAllPages = async (url, config = {}) => {
+    const data = [];
+    let after;
+    do {
+        const res = await api.get(url, { ...config, params: { ...config.params, after } });
+        data.push(...res.data);
+        after = res.headers['x-next-cursor'];
+    } while (after);
+    return { data };
+};
+
 export default api;
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
-import api from '../api/axios';
+import api, { getAllPages } from '../api/axios';
 import { LogOut, Calendar, Download, Save, CheckCircle, XCircle } from 'lucide-react';
 import toast from 'react-hot-toast';
 
@@ -56,12 +56,12 @@ const TeacherDashboard = () => {
 
             url += params.toString();
 
-            const res = await api.get(url);
+            const res = await getAllPages(url);
             setStudents(res.data);
 
             // Fetch existing attendance for this date
             try {
-                const attRes = await api.get('/attendance', {
+                const attRes = await getAllPages('/attendance', {
                     params: {
                         date: new Date(date).toISOString(), // Ensure this matches backend expectation
                         branch: (branch && branch !== 'All') ? branch : undefined,
@@ -14,14 +14,10 @@ async def test_startup():
         from app.main import app
         print("FastAPI app initialized successfully.")
         
-        # Manually trigger startup events
-        print("Triggering startup events...")
-        for handler in app.router.on_startup:
-            if asyncio.iscoroutinefunction(handler):
-                await handler()
-            else:
-                handler()
-        print("Startup events completed successfully.")
+        # Run the lifespan startup (connect, warm up, indexes, seeding) and shutdown
+        print("Running lifespan startup...")
+        async with app.router.lifespan_context(app):
+            print("Startup completed successfully.")
 
     except Exception as e:
         print(f"\nFAILED to start app: {e}")
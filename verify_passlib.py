@@ -6,17 +6,16 @@ import os
 sys.path.append(os.path.join(os.getcwd(), 'backend'))
 
 try:
-    print("Testing passlib and bcrypt compatibility...")
-    from passlib.context import CryptContext
+    print("Testing bcrypt password hashing...")
+    from app.core.security import get_password_hash, verify_password
     
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    hashed = pwd_context.hash("admin123")
+    hashed = get_password_hash("admin123")
     print(f"Hashing successful: {hashed}")
     
-    verified = pwd_context.verify("admin123", hashed)
+    verified = verify_password("admin123", hashed)
     print(f"Verification successful: {verified}")
 
-    print("\nPasslib and Bcrypt are working correctly!")
+    print("\nBcrypt hashing is working correctly!")
 
 except Exception as e:
     print(f"\nFAILED: {e}")